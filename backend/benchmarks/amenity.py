@@ -0,0 +1,109 @@
+"""Benchmark of amenity counting implementations against the pure-Python one.
+
+Run from the backend directory:
+
+    python -m benchmarks.amenity --amenities 50000 --queries 200
+"""
+
+import argparse
+from math import pi
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.common import measure, random_points
+from src.utils.amenity import (
+    DISTANCES,
+    Amenities,
+    build_amenities,
+    calculate_distances,
+    count_amenities,
+    get_distance,
+)
+
+TYPES = ["eat", "culture", "edu", "health"]
+
+
+def calculate_distances_python(lat: float, lon: float, amenities: List[Dict[str, float | str]]) -> Dict[str, int]:
+    """Count amenities with the original loop over dicts.
+
+    Parameters
+    ----------
+     lat: float
+     lon: float
+     amenities: List[Dict[str, float | str]]
+
+    Returns
+    -------
+     distances: Dict[str, int]
+
+    """
+    distance_data: Dict[str, int] = dict()
+    for amenity_item in amenities:
+        calculated_distance = get_distance(lon, lat, float(amenity_item['lon']), float(amenity_item['lat']))
+        for distance in DISTANCES:
+            key: str = str(amenity_item['type']) + '_' + str(distance)
+            distance_data[key] = distance_data.get(key, 0)
+            if calculated_distance < distance:
+                distance_data[key] += 1
+    return distance_data
+
+
+def calculate_distances_brute_force(lat: float, lon: float, amenities: Amenities) -> Dict[str, int]:
+    """Count amenities with the vectorized formula checking every amenity.
+
+    Parameters
+    ----------
+     lat: float
+     lon: float
+     amenities: Amenities
+
+    Returns
+    -------
+     distances: Dict[str, int]
+
+    """
+    rows = np.zeros(len(amenities), dtype=np.intp)
+    indices = np.arange(len(amenities), dtype=np.intp)
+    distance_data = count_amenities(
+        np.array([lat * pi / 180.0]), np.array([lon * pi / 180.0]), amenities, rows, indices
+    )
+    return {key: int(counts[0]) for key, counts in distance_data.items()}
+
+
+def main() -> None:
+    """Compare implementations and print timings."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--amenities", type=int, default=50_000, help="Count of amenities")
+    parser.add_argument("--queries", type=int, default=100, help="Count of query points")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    coordinates = {name: random_points(args.amenities // len(TYPES), rng) for name in TYPES}
+    amenities_list: List[Dict[str, float | str]] = [
+        dict(lat=lat, lon=lon, type=name) for name, points in coordinates.items() for lat, lon in points
+    ]
+    amenities = build_amenities(coordinates)
+    queries = random_points(args.queries, rng)
+
+    implementations: Dict[str, Callable[[float, float], Dict[str, int]]] = {
+        "python": lambda lat, lon: calculate_distances_python(lat, lon, amenities_list),
+        "numpy": lambda lat, lon: calculate_distances_brute_force(lat, lon, amenities),
+        "index": lambda lat, lon: calculate_distances(lat, lon, amenities),
+    }
+    for lat, lon in queries:
+        expected = implementations["python"](lat, lon)
+        for name, func in implementations.items():
+            actual = func(lat, lon)
+            if expected != actual:
+                raise AssertionError(f"Mismatch of {name} at ({lat}, {lon}): {expected} != {actual}")
+
+    print(f"amenities: {len(amenities)}, queries: {len(queries)}, results are identical")
+    timings = {name: measure(func, queries) for name, func in implementations.items()}
+    for name, mean_time in timings.items():
+        print(f"{name:>7}: {mean_time * 1000:.3f} ms/call, speedup {timings['python'] / mean_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Helpers for benchmarks: local model, Geoapify stub, server running in thread and JSON results."""
+
+import asyncio
+import datetime
+import json
+import os
+import platform
+import socket
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import uvicorn
+from aiohttp import web
+from catboost import CatBoostRegressor
+from fastapi import FastAPI
+
+from src.utils.feature_preparing import COLUMNS
+
+# bounds of downloaded amenities, the same as in research/src/features/download_amenities.py
+AREA_BOUND = (55.41343, 37.29172, 56.04673, 38.01132)
+# the same as in research/src/models/catboost_model.py
+CAT_FEATURES = ["type of house", "number of rooms", "area of apartment", "repair", "terrace", "bathroom"]
+
+HOUSE_TYPES = ["панельный", "кирпичный", "монолитный", "блочный"]
+REPAIR_TYPES = ["косметический", "дизайнерский", "нет", "евро"]
+TERRACE_TYPES = ["балкон", "лоджия", "нет"]
+BATHROOM_TYPES = ["совмещенный", "раздельный", "несколько"]
+
+
+def random_points(count: int, rng: np.random.Generator) -> List[Tuple[float, float]]:
+    """Generate uniformly distributed points in the area.
+
+    Parameters
+    ----------
+     count: int
+     rng: np.random.Generator
+
+    Returns
+    -------
+     list of (lat, lon): List[Tuple[float, float]]
+
+    """
+    lat = rng.uniform(AREA_BOUND[0], AREA_BOUND[2], count)
+    lon = rng.uniform(AREA_BOUND[1], AREA_BOUND[3], count)
+    return list(zip(lat.tolist(), lon.tolist()))
+
+
+def random_apartment(rng: np.random.Generator) -> Dict[str, Any]:
+    """Generate request body for /api/predict_with_coordinates.
+
+    Parameters
+    ----------
+     rng: np.random.Generator
+
+    Returns
+    -------
+     body: Dict[str, Any]
+
+    """
+    floors = int(rng.integers(1, 40))
+    (lat, lon), = random_points(1, rng)
+    return dict(
+        number_of_floors=floors,
+        type_of_house=str(rng.choice(HOUSE_TYPES)),
+        number_of_rooms=int(rng.integers(1, 6)),
+        area_of_apartment=int(rng.integers(20, 200)),
+        apartment_floor=int(rng.integers(1, floors + 1)),
+        repair=str(rng.choice(REPAIR_TYPES)),
+        terrace=str(rng.choice(TERRACE_TYPES)),
+        extra=bool(rng.integers(0, 2)),
+        elevator=int(rng.integers(0, 4)),
+        bathroom=str(rng.choice(BATHROOM_TYPES)),
+        lat=lat,
+        lon=lon,
+    )
+
+
+def train_local_model(path: str, n_estimators: int = 150, rows: int = 2000, seed: int = 0) -> None:
+    """Train CatBoost model on synthetic data with features of the service and save it.
+
+    Parameters
+    ----------
+     path: path of .cbm file
+     n_estimators: int
+     rows: count of training rows
+     seed: int
+
+    Returns
+    -------
+     nothing
+
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: rng.integers(0, 30, rows) for column in COLUMNS})
+    df["type of house"] = rng.choice(HOUSE_TYPES, rows)
+    df["repair"] = rng.choice(REPAIR_TYPES, rows)
+    df["terrace"] = rng.choice(TERRACE_TYPES, rows)
+    df["bathroom"] = rng.choice(BATHROOM_TYPES, rows)
+    df["extra"] = rng.integers(0, 2, rows).astype(bool)
+    df["lat"] = rng.uniform(AREA_BOUND[0], AREA_BOUND[2], rows)
+    df["lon"] = rng.uniform(AREA_BOUND[1], AREA_BOUND[3], rows)
+    target = df["area of apartment"] * 300_000 + rng.normal(0, 1_000_000, rows)
+    model = CatBoostRegressor(n_estimators=n_estimators, max_depth=8, verbose=False, allow_writing_files=False)
+    model.fit(df, target, cat_features=CAT_FEATURES)
+    model.save_model(path)
+
+
+def get_free_port() -> int:
+    """Get free local port.
+
+    Returns
+    -------
+     port: int
+
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+async def start_geoapify_stub(delay: float) -> Tuple[web.AppRunner, str]:
+    """Start local server answering like Geoapify geocoding API.
+
+    Parameters
+    ----------
+     delay: response delay in seconds
+
+    Returns
+    -------
+     runner and url of geocoding endpoint: Tuple[web.AppRunner, str]
+
+    """
+    rng = np.random.default_rng(0)
+
+    async def search(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        (lat, lon), = random_points(1, rng)
+        return web.json_response({"results": [{"lat": lat, "lon": lon, "rank": {"match_type": "full_match"}}]})
+
+    application = web.Application()
+    application.router.add_get("/v1/geocode/search", search)
+    runner = web.AppRunner(application, access_log=None)
+    await runner.setup()
+    port = get_free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, f"http://127.0.0.1:{port}/v1/geocode/search"
+
+
+class ServerThread:
+    """Uvicorn server running in thread."""
+
+    def __init__(self, app: FastAPI) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         app: FastAPI
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.port = get_free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "ServerThread":
+        """Start server and wait for startup.
+
+        Returns
+        -------
+         server: ServerThread
+
+        """
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Stop server."""
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def measure(func: Callable[..., object], calls: Sequence[Tuple[Any, ...]], warm_up: bool = False) -> float:
+    """Measure mean time of one call.
+
+    Parameters
+    ----------
+     func: measured function
+     calls: arguments of every timed call
+     warm_up: make the first call before timing, e.g. to start thread pools of model
+
+    Returns
+    -------
+     mean time in seconds: float
+
+    """
+    if warm_up:
+        func(*calls[0])
+    start = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return (time.perf_counter() - start) / len(calls)
+
+
+def percentiles(latencies: Sequence[float]) -> Dict[str, float]:
+    """Calculate latency percentiles in milliseconds.
+
+    Parameters
+    ----------
+     latencies: latencies in seconds
+
+    Returns
+    -------
+     p50, p95, p99 and max: Dict[str, float]
+
+    """
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def summarize(latencies: Sequence[float], elapsed: float, items: int = 1) -> Dict[str, float]:
+    """Calculate throughput and latency percentiles.
+
+    Parameters
+    ----------
+     latencies: latencies of calls in seconds
+     elapsed: wall time of all calls in seconds
+     items: count of items processed by one call
+
+    Returns
+    -------
+     count, throughput in items per second and percentiles: Dict[str, float]
+
+    """
+    return {
+        "count": len(latencies),
+        "throughput_per_s": len(latencies) * items / elapsed if elapsed > 0 else 0.0,
+        **percentiles(latencies),
+    }
+
+
+def get_environment() -> Dict[str, Any]:
+    """Describe environment of run, so results of different runs can be compared.
+
+    Returns
+    -------
+     environment: Dict[str, Any]
+
+    """
+    try:
+        commit: Optional[str] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: str, benchmark: str, params: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+    """Write results of benchmark as JSON.
+
+    Every result has a "name" and optional "batch_size" or "endpoint", they identify it in comparisons
+    made by benchmarks.compare.
+
+    Parameters
+    ----------
+     path: path of JSON file
+     benchmark: name of benchmark
+     params: arguments of run
+     results: list of results
+
+    Returns
+    -------
+     nothing
+
+    """
+    report = {"benchmark": benchmark, "environment": get_environment(), "params": params, "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,88 @@
+"""Comparison of two JSON results of benchmarks.micro or benchmarks.load.
+
+Results are matched by name and batch size or endpoint. A result regresses if one of its latency
+percentiles grows or its throughput falls by more than the tolerance. Exits with code 1 if there are
+regressions, so it can be used in CI. Run from the backend directory:
+
+    python -m benchmarks.compare baseline.json current.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+LATENCY_FIELDS = ("p50_ms", "p95_ms", "p99_ms")
+THROUGHPUT_FIELD = "throughput_per_s"
+
+
+def load_results(path: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Load results by key.
+
+    Parameters
+    ----------
+     path: path of JSON file
+
+    Returns
+    -------
+     results by name and batch size or endpoint: Dict[Tuple[str, str], Dict[str, Any]]
+
+    """
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {
+        (result["name"], str(result.get("batch_size", result.get("endpoint", "")))): result
+        for result in report["results"]
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float
+) -> List[Tuple[str, float, float, float, bool]]:
+    """Compare metrics of two results.
+
+    Parameters
+    ----------
+     baseline: result of baseline run
+     current: result of current run
+     tolerance: allowed relative change
+
+    Returns
+    -------
+     field, baseline value, current value, relative change and regression flag: List[Tuple]
+
+    """
+    rows = []
+    for field in (*LATENCY_FIELDS, THROUGHPUT_FIELD):
+        if field not in baseline or field not in current or not baseline[field]:
+            continue
+        change = current[field] / baseline[field] - 1
+        regression = change < -tolerance if field == THROUGHPUT_FIELD else change > tolerance
+        rows.append((field, baseline[field], current[field], change, regression))
+    return rows
+
+
+def main() -> None:
+    """Print comparison and exit with code 1 if there are regressions."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="JSON results of baseline run")
+    parser.add_argument("current", help="JSON results of current run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative change")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys()):
+        for field, old, new, change, regression in compare_results(baseline[key], current[key], args.tolerance):
+            regressions += regression
+            mark = "REGRESSION" if regression else ""
+            print(f"{key[0]:<28} {key[1]:>12} {field:<16} {old:>12.3f} -> {new:>12.3f} {change:+8.1%} {mark}")
+    for key in sorted(baseline.keys() ^ current.keys()):
+        print(f"{key[0]:<28} {key[1]:>12} is only in {'baseline' if key in baseline else 'current'}")
+    print(f"{regressions} regressions with tolerance {args.tolerance:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
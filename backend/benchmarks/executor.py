@@ -0,0 +1,127 @@
+"""Load test of prediction executors under mixed geocoding and coordinates traffic.
+
+Runs the service with a locally trained CatBoost model and a local Geoapify stub for every executor kind
+and reports latency percentiles of both endpoints. Run from the backend directory:
+
+    python -m benchmarks.executor --requests 2000 --concurrency 32 --executors inline thread process
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+import numpy as np
+
+import src.utils.geoapify
+from benchmarks.common import ServerThread, percentiles, random_apartment, start_geoapify_stub, train_local_model
+from src.app import app
+from src.config import app_config
+from src.utils.executor import EXECUTOR_KINDS
+
+
+async def run_load(
+    url: str, requests: int, concurrency: int, geocode_share: float, seed: int
+) -> Dict[str, List[float]]:
+    """Send mixed requests and collect latencies.
+
+    Parameters
+    ----------
+     url: url of service
+     requests: total count of requests
+     concurrency: count of concurrent clients
+     geocode_share: share of requests to /api/predict_with_address
+     seed: int
+
+    Returns
+    -------
+     latencies by endpoint: Dict[str, List[float]]
+
+    """
+    rng = np.random.default_rng(seed)
+    bodies = []
+    for _ in range(requests):
+        body = random_apartment(rng)
+        if rng.random() < geocode_share:
+            body.pop("lat")
+            body.pop("lon")
+            bodies.append(("predict_with_address", dict(body, address="stub address")))
+        else:
+            bodies.append(("predict_with_coordinates", body))
+    latencies: Dict[str, List[float]] = {"predict_with_address": [], "predict_with_coordinates": []}
+    queue: "asyncio.Queue[Any]" = asyncio.Queue()
+    for item in bodies:
+        queue.put_nowait(item)
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        while not queue.empty():
+            endpoint, body = queue.get_nowait()
+            start = time.perf_counter()
+            async with session.post(f"{url}/api/{endpoint}", json=body) as response:
+                await response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"{endpoint} returned {response.status}")
+            latencies[endpoint].append(time.perf_counter() - start)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*[client(session) for _ in range(concurrency)])
+    return latencies
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    """Run load for every executor kind and print results.
+
+    Parameters
+    ----------
+     args: argparse.Namespace
+
+    Returns
+    -------
+     nothing
+
+    """
+    runner, geoapify_url = await start_geoapify_stub(args.geocode_delay_ms / 1000)
+    src.utils.geoapify.URL = geoapify_url
+    app_config.GEOAPIFY_TOKEN = "stub"
+    try:
+        for kind in args.executors:
+            app_config.PREDICTION_EXECUTOR = kind
+            app_config.PREDICTION_EXECUTOR_WORKERS = args.workers
+            with ServerThread(app) as server:
+                await run_load(server.url, min(args.requests, 100), args.concurrency, args.geocode_share, args.seed)
+                start = time.perf_counter()
+                latencies = await run_load(server.url, args.requests, args.concurrency, args.geocode_share, args.seed)
+                elapsed = time.perf_counter() - start
+            print(f"executor: {kind}, throughput: {args.requests / elapsed:.1f} req/s")
+            for endpoint, values in latencies.items():
+                stats = ", ".join(f"{name} {value:.1f}" for name, value in percentiles(values).items())
+                print(f"  {endpoint}: {stats}")
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    """Parse arguments and run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--geocode-share", type=float, default=0.5, help="Share of requests with address")
+    parser.add_argument("--geocode-delay-ms", type=float, default=30, help="Response delay of Geoapify stub")
+    parser.add_argument("--executors", nargs="+", default=["inline", "thread"], choices=EXECUTOR_KINDS)
+    parser.add_argument("--workers", type=int, default=4, help="Threads or processes of executor")
+    parser.add_argument("--trees", type=int, default=500, help="Trees of local CatBoost model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app_config.MODEL_PATH = os.path.join(tmp_dir, "model.cbm")
+        app_config.AMENITY_DIR_PATH = app_config.AMENITY_DIR_PATH or "src/static/amenity"
+        train_local_model(app_config.MODEL_PATH, n_estimators=args.trees)
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark of feature dataframe assembling against the original dict and pandas implementation.
+
+Run from the backend directory:
+
+    python -m benchmarks.features --repeats 1000
+"""
+
+import argparse
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import measure, random_apartment
+from src.schemas.predict import BasePredictionIn, PredictionWithCoordinatesIn
+from src.utils.amenity import calculate_distances, load_amenities_data
+from src.utils.feature_preparing import COLUMNS, make_features_dataframe, make_features_dataframe_batch
+
+
+def make_features_dataframe_pandas(
+    apartment_data: BasePredictionIn, lat: float, lon: float, distance_data: Dict[str, int]
+) -> pd.DataFrame:
+    """Compose features with the original implementation.
+
+    :param apartment_data: user data
+    :param lat: latitude
+    :param lon: longitude
+    :param distance_data: dict with distances
+    :return: feature dataframe
+    """
+    prediction_data = {
+        "lat": lat,
+        "lon": lon,
+        "number of floors": apartment_data.number_of_floors,
+        "type of house": apartment_data.type_of_house.value,
+        "number of rooms": apartment_data.number_of_rooms,
+        "area of apartment": apartment_data.area_of_apartment,
+        "apartment floor": apartment_data.apartment_floor,
+        "repair": apartment_data.repair.value,
+        "terrace": apartment_data.terrace.value,
+        "extra": apartment_data.extra,
+        "elevator": apartment_data.elevator,
+        "bathroom": apartment_data.bathroom.value,
+    }
+    prediction_data = dict(**prediction_data, **distance_data)
+
+    df = pd.DataFrame(data=[prediction_data], columns=COLUMNS)
+
+    for col in ["eat_500", "eat_1500", "eat_3000", "culture_500", "culture_1500",
+                "culture_3000", "edu_500", "edu_1500", "edu_3000", "health_500",
+                "health_1500", "health_3000"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+
+    return df
+
+
+def make_features_dataframes_pandas(
+    apartments_data: Sequence[PredictionWithCoordinatesIn], distances: List[Dict[str, int]]
+) -> List[pd.DataFrame]:
+    """Compose features of every apartment with the original implementation.
+
+    :param apartments_data: user data with coordinates
+    :param distances: dict with distances for every apartment
+    :return: feature dataframes
+    """
+    return [
+        make_features_dataframe_pandas(item, item.lat, item.lon, row) for item, row in zip(apartments_data, distances)
+    ]
+
+
+def main() -> None:
+    """Compare implementations and print timings."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+    parser.add_argument("--amenity-dir", default="src/static/amenity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    amenities = load_amenities_data(args.amenity_dir)
+    items: List[PredictionWithCoordinatesIn] = [
+        PredictionWithCoordinatesIn(**random_apartment(rng)) for _ in range(max(args.batch_sizes))
+    ]
+    distances = [calculate_distances(item.lat, item.lon, amenities) for item in items]
+
+    for item, distance_data in zip(items, distances):
+        expected = make_features_dataframe_pandas(item, item.lat, item.lon, distance_data)
+        pd.testing.assert_frame_equal(make_features_dataframe(item, item.lat, item.lon, distance_data), expected)
+    print(f"checked {len(items)} rows, dataframes are identical")
+
+    for size in args.batch_sizes:
+        batch: Sequence[PredictionWithCoordinatesIn] = items[:size]
+        batch_distances = {key: [row[key] for row in distances[:size]] for key in distances[0]}
+        lats = [item.lat for item in batch]
+        lons = [item.lon for item in batch]
+        expected = pd.concat(
+            [make_features_dataframe_pandas(item, item.lat, item.lon, row) for item, row in zip(batch, distances)],
+            ignore_index=True,
+        )
+        pd.testing.assert_frame_equal(make_features_dataframe_batch(batch, lats, lons, batch_distances), expected)
+        repeats = max(1, args.repeats // size)
+        pandas_time = measure(make_features_dataframes_pandas, [(batch, distances)] * repeats)
+        buffer_time = measure(make_features_dataframe_batch, [(batch, lats, lons, batch_distances)] * repeats)
+        print(
+            f"batch {size:>5}: pandas per row {pandas_time * 1e6 / size:.1f} us, "
+            f"buffer per row {buffer_time * 1e6 / size:.1f} us, speedup {pandas_time / buffer_time:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
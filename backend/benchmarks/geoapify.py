@@ -0,0 +1,91 @@
+"""Benchmark of Geoapify requests with a session per request against the shared pooled client.
+
+Sends requests to a local Geoapify stub, so only connection setup and session overhead are measured,
+TLS handshake of the real API is not included. Run from the backend directory:
+
+    python -m benchmarks.geoapify --requests 2000 --concurrency 1 16 64
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+from benchmarks.common import percentiles, start_geoapify_stub
+from src.utils.geoapify import GeoapifyClient, build_params, send_request
+
+
+async def run_requests(url: str, requests: int, concurrency: int, client: Optional[GeoapifyClient]) -> List[float]:
+    """Send requests with given concurrency and collect latencies.
+
+    Parameters
+    ----------
+     url: url of stub
+     requests: total count of requests
+     concurrency: count of concurrent clients
+     client: shared client or None to open session per request
+
+    Returns
+    -------
+     latencies: List[float]
+
+    """
+    params = build_params("stub address", "stub")
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            start = time.perf_counter()
+            await send_request(url, params, client)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    """Run requests for every concurrency and print results.
+
+    Parameters
+    ----------
+     args: argparse.Namespace
+
+    Returns
+    -------
+     nothing
+
+    """
+    runner, url = await start_geoapify_stub(args.delay_ms / 1000)
+    client = GeoapifyClient(
+        pool_size=args.pool_size, concurrency=args.pool_size, timeout=30, dns_cache_ttl=300, keepalive_timeout=30
+    )
+    try:
+        for concurrency in args.concurrency:
+            for name, session_client in (("session per request", None), ("shared client", client)):
+                await run_requests(url, min(args.requests, 100), concurrency, session_client)
+                start = time.perf_counter()
+                latencies = await run_requests(url, args.requests, concurrency, session_client)
+                elapsed = time.perf_counter() - start
+                stats = ", ".join(f"{key} {value:.2f}" for key, value in percentiles(latencies).items())
+                print(
+                    f"concurrency {concurrency:>3}, {name:<19}: {args.requests / elapsed:.0f} req/s, {stats}"
+                )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    """Parse arguments and run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--delay-ms", type=float, default=0, help="Response delay of Geoapify stub")
+    parser.add_argument("--pool-size", type=int, default=100, help="Connections of shared client")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""End-to-end async load generator for the prediction API with JSON results.
+
+Without --url the service is started in this process with a locally trained CatBoost model and a local
+Geoapify stub, so neither MLflow nor Geoapify is needed. With --url the load is sent to a running service.
+Requests are a mix of /api/predict_with_coordinates, /api/predict_with_address and /api/predict_batch.
+
+In closed loop (default) --concurrency clients send the next request after the response. With --rate
+requests are sent at a fixed rate regardless of responses, and latency is counted from the scheduled
+time of request, so queueing in an overloaded service is not hidden. Run from the backend directory:
+
+    python -m benchmarks.load --duration 30 --concurrency 32 --mix coordinates=0.6 address=0.3 batch=0.1
+    python -m benchmarks.load --duration 30 --rate 200 --output load.json
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import aiohttp
+import numpy as np
+
+import src.utils.geoapify
+from benchmarks.common import (
+    ServerThread,
+    random_apartment,
+    start_geoapify_stub,
+    summarize,
+    train_local_model,
+    write_results,
+)
+from src.app import app
+from src.config import app_config
+from src.utils.executor import EXECUTOR_KINDS
+
+ENDPOINTS = {
+    "coordinates": "predict_with_coordinates",
+    "address": "predict_with_address",
+    "batch": "predict_batch",
+}
+
+
+class RequestFactory:
+    """Random request bodies for endpoints."""
+
+    def __init__(self, mix: Dict[str, float], batch_size: int, addresses: int, seed: int) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         mix: share of requests by endpoint
+         batch_size: count of apartments in /api/predict_batch
+         addresses: count of distinct addresses, controls hits of geocoding cache
+         seed: int
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.rng = np.random.default_rng(seed)
+        self.names = list(mix)
+        self.probabilities = np.array([mix[name] for name in self.names]) / sum(mix.values())
+        self.batch_size = batch_size
+        self.addresses = addresses
+
+    def address_body(self) -> Dict[str, Any]:
+        """Make body with random address.
+
+        Returns
+        -------
+         body: Dict[str, Any]
+
+        """
+        body = random_apartment(self.rng)
+        body.pop("lat")
+        body.pop("lon")
+        return dict(body, address=f"stub address {self.rng.integers(0, self.addresses)}")
+
+    def make(self) -> Tuple[str, Dict[str, Any]]:
+        """Make request to random endpoint.
+
+        Returns
+        -------
+         name of endpoint and body: Tuple[str, Dict[str, Any]]
+
+        """
+        name = str(self.rng.choice(self.names, p=self.probabilities))
+        if name == "coordinates":
+            return name, random_apartment(self.rng)
+        if name == "address":
+            return name, self.address_body()
+        return name, {"items": [random_apartment(self.rng) for _ in range(self.batch_size)], "address_items": []}
+
+
+class LoadResults:
+    """Latencies and errors by endpoint."""
+
+    def __init__(self) -> None:
+        """Set values."""
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.recording = False
+
+    def add(self, name: str, latency: float, ok: bool) -> None:
+        """Record response if warm-up is over.
+
+        Parameters
+        ----------
+         name: name of endpoint
+         latency: seconds
+         ok: response has status 200
+
+        Returns
+        -------
+         nothing
+
+        """
+        if not self.recording:
+            return
+        if ok:
+            self.latencies[name].append(latency)
+        else:
+            self.errors[name] += 1
+
+    def summarize(self, elapsed: float, batch_size: int) -> List[Dict[str, Any]]:
+        """Build results of endpoints which got requests.
+
+        Parameters
+        ----------
+         elapsed: duration of measured load in seconds
+         batch_size: count of apartments in /api/predict_batch
+
+        Returns
+        -------
+         results: List[Dict[str, Any]]
+
+        """
+        results = []
+        for name, latencies in self.latencies.items():
+            if latencies or self.errors[name]:
+                stats = summarize(latencies, elapsed)
+                results.append({"name": "load", "endpoint": name, "errors": self.errors[name], **stats})
+                if name == "batch":
+                    results[-1]["apartments_per_s"] = stats["throughput_per_s"] * batch_size
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        stats = summarize(all_latencies, elapsed)
+        results.append({"name": "load", "endpoint": "all", "errors": sum(self.errors.values()), **stats})
+        return results
+
+
+async def send(
+    session: aiohttp.ClientSession, url: str, name: str, body: Dict[str, Any], start: float, results: LoadResults
+) -> None:
+    """Send request and record its latency.
+
+    Parameters
+    ----------
+     session: aiohttp.ClientSession
+     url: url of service
+     name: name of endpoint
+     body: body of request
+     start: time from which latency is counted
+     results: LoadResults
+
+    Returns
+    -------
+     nothing
+
+    """
+    try:
+        async with session.post(f"{url}/api/{ENDPOINTS[name]}", json=body) as response:
+            await response.read()
+            ok = response.status == 200
+    except aiohttp.ClientError:
+        ok = False
+    results.add(name, time.perf_counter() - start, ok)
+
+
+async def run_closed_loop(
+    session: aiohttp.ClientSession,
+    url: str,
+    factory: RequestFactory,
+    concurrency: int,
+    deadline: float,
+    results: LoadResults,
+) -> None:
+    """Send requests from clients waiting for responses.
+
+    Parameters
+    ----------
+     session: aiohttp.ClientSession
+     url: url of service
+     factory: RequestFactory
+     concurrency: count of clients
+     deadline: time of end of load
+     results: LoadResults
+
+    Returns
+    -------
+     nothing
+
+    """
+    async def client() -> None:
+        while time.perf_counter() < deadline:
+            name, body = factory.make()
+            await send(session, url, name, body, time.perf_counter(), results)
+
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+
+
+async def run_open_loop(
+    session: aiohttp.ClientSession,
+    url: str,
+    factory: RequestFactory,
+    rate: float,
+    deadline: float,
+    results: LoadResults,
+) -> None:
+    """Send requests at fixed rate without waiting for responses.
+
+    Parameters
+    ----------
+     session: aiohttp.ClientSession
+     url: url of service
+     factory: RequestFactory
+     rate: requests per second
+     deadline: time of end of load
+     results: LoadResults
+
+    Returns
+    -------
+     nothing
+
+    """
+    tasks = set()
+    scheduled = time.perf_counter()
+    while scheduled < deadline:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, body = factory.make()
+        task = asyncio.create_task(send(session, url, name, body, scheduled, results))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        scheduled += 1 / rate
+    await asyncio.gather(*tasks)
+
+
+async def wait_ready(url: str, timeout: float) -> None:
+    """Wait until service is ready.
+
+    Parameters
+    ----------
+     url: url of service
+     timeout: seconds
+
+    Returns
+    -------
+     nothing
+
+    """
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/health/ready") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientConnectionError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Service is not ready")
+
+
+async def run_load(url: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Warm up service, run measured load and summarize it.
+
+    Parameters
+    ----------
+     url: url of service
+     args: argparse.Namespace
+
+    Returns
+    -------
+     results: List[Dict[str, Any]]
+
+    """
+    await wait_ready(url, args.startup_timeout)
+    factory = RequestFactory(dict(args.mix), args.batch_size, args.addresses, args.seed)
+    results = LoadResults()
+    connector = aiohttp.TCPConnector(limit=args.max_connections)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for duration, recording in ((args.warm_up, False), (args.duration, True)):
+            results.recording = recording
+            start = time.perf_counter()
+            if args.rate:
+                await run_open_loop(session, url, factory, args.rate, start + duration, results)
+            else:
+                await run_closed_loop(session, url, factory, args.concurrency, start + duration, results)
+        elapsed = time.perf_counter() - start
+    return results.summarize(elapsed, args.batch_size)
+
+
+async def run_local(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Run load against service started in this process with Geoapify stub.
+
+    Parameters
+    ----------
+     args: argparse.Namespace
+
+    Returns
+    -------
+     results: List[Dict[str, Any]]
+
+    """
+    runner, geoapify_url = await start_geoapify_stub(args.geocode_delay_ms / 1000)
+    src.utils.geoapify.URL = geoapify_url
+    app_config.GEOAPIFY_TOKEN = "stub"
+    app_config.PREDICTION_EXECUTOR = args.executor
+    try:
+        with ServerThread(app) as server:
+            return await run_load(server.url, args)
+    finally:
+        await runner.cleanup()
+
+
+def parse_share(value: str) -> Tuple[str, float]:
+    """Parse share of endpoint like address=0.3.
+
+    Parameters
+    ----------
+     value: str
+
+    Returns
+    -------
+     name of endpoint and share: Tuple[str, float]
+
+    """
+    name, _, share = value.partition("=")
+    if name not in ENDPOINTS:
+        raise argparse.ArgumentTypeError(f"Unknown endpoint {name}, expected one of {', '.join(ENDPOINTS)}")
+    return name, float(share)
+
+
+def main() -> None:
+    """Parse arguments, run load and report results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="", help="Url of running service, by default service is started here")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of measured load")
+    parser.add_argument("--warm-up", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clients of closed loop")
+    parser.add_argument("--rate", type=float, default=0.0, help="Requests per second of open loop")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument(
+        "--mix", type=parse_share, nargs="+", default=[("coordinates", 0.7), ("address", 0.3)],
+        help="Shares of endpoints: coordinates, address and batch",
+    )
+    parser.add_argument("--batch-size", type=int, default=32, help="Apartments in /api/predict_batch")
+    parser.add_argument("--addresses", type=int, default=1000, help="Distinct addresses of address requests")
+    parser.add_argument("--geocode-delay-ms", type=float, default=30, help="Response delay of Geoapify stub")
+    parser.add_argument("--executor", default=app_config.PREDICTION_EXECUTOR, choices=EXECUTOR_KINDS)
+    parser.add_argument("--trees", type=int, default=500, help="Trees of local CatBoost model")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="Path of JSON file with results")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(run_load(args.url, args))
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            app_config.MODEL_PATH = os.path.join(tmp_dir, "model.cbm")
+            app_config.AMENITY_DIR_PATH = app_config.AMENITY_DIR_PATH or "src/static/amenity"
+            train_local_model(app_config.MODEL_PATH, n_estimators=args.trees)
+            results = asyncio.run(run_local(args))
+    for result in results:
+        print(
+            f"{result['endpoint']:<12} {result['count']:>7} ok, {result['errors']:>5} errors, "
+            f"{result['throughput_per_s']:.1f} req/s, p50 {result.get('p50_ms', 0):.1f} ms, "
+            f"p95 {result.get('p95_ms', 0):.1f} ms, p99 {result.get('p99_ms', 0):.1f} ms"
+        )
+    if args.output:
+        write_results(args.output, "load", dict(vars(args), mix=dict(args.mix)), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Microbenchmarks of stages of prediction at several batch sizes with JSON results.
+
+Measures amenity counting, building of features and the model call separately and together in
+predict_apartments, every call is timed to get latency percentiles. The local CatBoost model is trained
+on synthetic data, with --pyfunc it is also called through the mlflow pyfunc wrapper. Run from the backend
+directory:
+
+    python -m benchmarks.micro --batch-sizes 1 32 1024 --output micro.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import mlflow
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from catboost import CatBoostRegressor
+from mlflow.models import infer_signature
+
+from benchmarks.common import random_apartment, summarize, train_local_model, write_results
+from src.schemas.predict import PredictionWithCoordinatesIn
+from src.utils.amenity import calculate_distances_batch, load_amenities_data
+from src.utils.feature_preparing import features_to_dataframe, get_feature_buffer
+from src.utils.models import NativeCatBoostModel
+from src.utils.prediction import predict_apartments
+
+
+def measure_calls(func: Callable[[int], object], calls: int, items: int, warm_up: int = 3) -> Dict[str, float]:
+    """Time every call of function.
+
+    Parameters
+    ----------
+     func: function of number of call
+     calls: count of timed calls
+     items: count of items processed by one call
+     warm_up: count of calls which are not timed
+
+    Returns
+    -------
+     count, items per second and latency percentiles: Dict[str, float]
+
+    """
+    for index in range(warm_up):
+        func(index)
+    latencies = []
+    start = time.perf_counter()
+    for index in range(calls):
+        call_start = time.perf_counter()
+        func(index)
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start, items)
+
+
+def call_in_turn(func: Callable[..., object], args_list: Sequence[Tuple[Any, ...]], index: int) -> object:
+    """Call function with arguments of batches in turn.
+
+    Parameters
+    ----------
+     func: function to call
+     args_list: arguments of every batch
+     index: number of call
+
+    Returns
+    -------
+     result of function: object
+
+    """
+    return func(*args_list[index % len(args_list)])
+
+
+def make_features_dataframe(
+    items: List[PredictionWithCoordinatesIn],
+    lats: npt.NDArray[np.float64],
+    lons: npt.NDArray[np.float64],
+    distances: Dict[str, npt.NDArray[np.int64]],
+) -> pd.DataFrame:
+    """Build features of batch and convert them to dataframe.
+
+    Parameters
+    ----------
+     items: apartments of batch
+     lats: latitudes of apartments
+     lons: longitudes of apartments
+     distances: counts of amenities within distances
+
+    Returns
+    -------
+     features: pd.DataFrame
+
+    """
+    return features_to_dataframe(get_feature_buffer().fill(items, lats, lons, distances))
+
+
+def main() -> None:
+    """Run microbenchmarks and write results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+    parser.add_argument("--calls", type=int, default=500, help="Timed calls for batch of 32 and less")
+    parser.add_argument("--trees", type=int, default=150)
+    parser.add_argument("--pyfunc", action="store_true", help="Also measure mlflow pyfunc model")
+    parser.add_argument("--amenity-dir", default="src/static/amenity")
+    parser.add_argument("--snapshot", default="", help="Directory with amenity snapshot")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="Path of JSON file with results")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    amenities = load_amenities_data(args.amenity_dir, args.snapshot)
+    # several batches of every size are used in turn
+    items = [PredictionWithCoordinatesIn(**random_apartment(rng)) for _ in range(4 * max(args.batch_sizes))]
+    lats = np.array([item.lat for item in items])
+    lons = np.array([item.lon for item in items])
+    results: List[Dict[str, Any]] = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.cbm")
+        train_local_model(model_path, n_estimators=args.trees)
+        catboost_model = CatBoostRegressor()
+        catboost_model.load_model(model_path)
+        models: Dict[str, Any] = {"native": NativeCatBoostModel(catboost_model)}
+        if args.pyfunc:
+            features = get_feature_buffer().fill(items, lats, lons, calculate_distances_batch(lats, lons, amenities))
+            df = features_to_dataframe(features)
+            signature = infer_signature(df, catboost_model.predict(df))
+            mlflow.catboost.save_model(catboost_model, os.path.join(tmp_dir, "mlflow"), signature=signature)
+            models["pyfunc"] = mlflow.pyfunc.load_model(os.path.join(tmp_dir, "mlflow"))
+
+        for size in args.batch_sizes:
+            calls = max(10, args.calls * 32 // max(size, 32))
+            batches = [slice(offset, offset + size) for offset in range(0, 4 * size, size)]
+            distances = [calculate_distances_batch(lats[batch], lons[batch], amenities) for batch in batches]
+            features_batches = []
+            for batch, distance in zip(batches, distances):
+                features = get_feature_buffer().fill(items[batch], lats[batch], lons[batch], distance)
+                # the buffer is reused by the next fill
+                features_batches.append({name: column.copy() for name, column in features.items()})
+            dataframes = [features_to_dataframe(features) for features in features_batches]
+            # arguments of every batch are prepared once, so slicing is not timed
+            batch_args = [(items[batch], lats[batch], lons[batch]) for batch in batches]
+            stages: Dict[str, Callable[[int], object]] = {
+                "calculate_distances": partial(
+                    call_in_turn,
+                    calculate_distances_batch,
+                    [(batch_lats, batch_lons, amenities) for _, batch_lats, batch_lons in batch_args],
+                ),
+                "make_features_dataframe": partial(
+                    call_in_turn,
+                    make_features_dataframe,
+                    [(*args, distance) for args, distance in zip(batch_args, distances)],
+                ),
+                "model_predict_native": partial(
+                    call_in_turn, models["native"].predict_features, [(features,) for features in features_batches]
+                ),
+            }
+            if "pyfunc" in models:
+                stages["model_predict_pyfunc"] = partial(
+                    call_in_turn, models["pyfunc"].predict, [(df,) for df in dataframes]
+                )
+            for name, model in models.items():
+                stages[f"predict_apartments_{name}"] = partial(
+                    call_in_turn, predict_apartments, [(model, amenities, *args) for args in batch_args]
+                )
+            for name, func in stages.items():
+                stats = measure_calls(func, calls, size)
+                results.append({"name": name, "batch_size": size, **stats})
+                print(
+                    f"{name:<28} batch {size:>5}: p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, "
+                    f"{stats['throughput_per_s']:.0f} items/s",
+                    flush=True,
+                )
+    if args.output:
+        write_results(args.output, "micro", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
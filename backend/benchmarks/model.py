@@ -0,0 +1,72 @@
+"""Microbenchmark of mlflow pyfunc model against native CatBoost model.
+
+The local CatBoost model is saved in mlflow format to a temporary directory, so no tracking server is needed.
+Run from the backend directory:
+
+    python -m benchmarks.model --batch-sizes 1 32 1024
+"""
+
+import argparse
+import os
+import tempfile
+
+import mlflow
+import numpy as np
+from catboost import CatBoostRegressor
+from mlflow.models import infer_signature
+
+from benchmarks.common import measure, random_apartment, train_local_model
+from src.schemas.predict import PredictionWithCoordinatesIn
+from src.utils.amenity import calculate_distances_batch, load_amenities_data
+from src.utils.feature_preparing import features_to_dataframe, get_feature_buffer
+from src.utils.models import NativeCatBoostModel
+
+
+def main() -> None:
+    """Compare models and print timings."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--trees", type=int, default=150)
+    parser.add_argument("--thread-count", type=int, default=-1, help="Threads of native model for batches")
+    parser.add_argument("--amenity-dir", default="src/static/amenity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    amenities = load_amenities_data(args.amenity_dir)
+    items = [PredictionWithCoordinatesIn(**random_apartment(rng)) for _ in range(max(args.batch_sizes))]
+    lats = [item.lat for item in items]
+    lons = [item.lon for item in items]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.cbm")
+        train_local_model(model_path, n_estimators=args.trees)
+        catboost_model = CatBoostRegressor()
+        catboost_model.load_model(model_path)
+        native_model = NativeCatBoostModel(catboost_model, args.thread_count)
+        features = get_feature_buffer().fill(
+            items, lats, lons, calculate_distances_batch(np.array(lats), np.array(lons), amenities)
+        )
+        df = features_to_dataframe(features)
+        mlflow.catboost.save_model(
+            catboost_model, os.path.join(tmp_dir, "mlflow"), signature=infer_signature(df, catboost_model.predict(df))
+        )
+        pyfunc_model = mlflow.pyfunc.load_model(os.path.join(tmp_dir, "mlflow"))
+
+        for size in args.batch_sizes:
+            batch_df = df.iloc[:size]
+            batch_features = {name: column[:size] for name, column in features.items()}
+            if not np.array_equal(pyfunc_model.predict(batch_df), native_model.predict_features(batch_features)):
+                raise AssertionError(f"Predictions differ for batch {size}")
+            repeats = max(1, args.repeats * 32 // max(size, 32))
+            pyfunc_time = measure(pyfunc_model.predict, [(batch_df,)] * repeats, warm_up=True)
+            native_time = measure(native_model.predict_features, [(batch_features,)] * repeats, warm_up=True)
+            print(
+                f"batch {size:>5}: pyfunc {pyfunc_time * 1000:.3f} ms, native {native_time * 1000:.3f} ms, "
+                f"speedup {pyfunc_time / native_time:.1f}x, predictions are identical"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Report of disagreement between raster and exact amenity counts and their timings.
+
+Checks that counts of the raster are exact for centers of cells, then compares counts for random points
+inside the geocoding circle and near amenities, where disagreement is the most likely. Run from the backend
+directory with the raster built by research/src/features/build_amenity_raster.py:
+
+    python -m benchmarks.raster --raster /path/to/amenity_raster --points 100000
+"""
+
+import argparse
+import time
+from dataclasses import replace
+from math import cos, pi, sqrt
+from typing import Dict
+
+import numpy as np
+import numpy.typing as npt
+
+from src.utils.amenity import EARTH_RADIUS, Amenities, calculate_distances_batch, load_amenities_data
+
+CENTER = (55.75197, 37.62354)
+RADIUS = 40000
+
+
+def random_circle_points(count: int, rng: np.random.Generator) -> npt.NDArray[np.float64]:
+    """Generate points uniformly distributed in the geocoding circle.
+
+    Parameters
+    ----------
+     count: int
+     rng: np.random.Generator
+
+    Returns
+    -------
+     latitudes and longitudes with shape (2, count): npt.NDArray[np.float64]
+
+    """
+    distance = RADIUS * np.sqrt(rng.random(count))
+    angle = rng.uniform(0, 2 * pi, count)
+    meters_per_degree = EARTH_RADIUS * pi / 180.0
+    lat = CENTER[0] + distance * np.sin(angle) / meters_per_degree
+    lon = CENTER[1] + distance * np.cos(angle) / (meters_per_degree * cos(CENTER[0] * pi / 180.0))
+    return np.stack((lat, lon))
+
+
+def compare(
+    exact: Dict[str, npt.NDArray[np.int64]], raster: Dict[str, npt.NDArray[np.int64]]
+) -> Dict[str, Dict[str, float]]:
+    """Calculate share of points with different counts and max difference for every column.
+
+    Parameters
+    ----------
+     exact: exact counts
+     raster: raster counts
+
+    Returns
+    -------
+     statistics by column: Dict[str, Dict[str, float]]
+
+    """
+    return {
+        name: {
+            "disagreement": float(np.mean(exact[name] != raster[name])),
+            "max_abs_diff": float(np.max(np.abs(exact[name] - raster[name]), initial=0)),
+        }
+        for name in exact
+    }
+
+
+def print_report(
+    title: str, exact_amenities: Amenities, raster_amenities: Amenities, points: npt.NDArray[np.float64]
+) -> None:
+    """Print disagreement and timings for points.
+
+    Parameters
+    ----------
+     title: name of points
+     exact_amenities: amenities without raster
+     raster_amenities: amenities with raster
+     points: latitudes and longitudes with shape (2, count)
+
+    Returns
+    -------
+     nothing
+
+    """
+    start = time.perf_counter()
+    exact = calculate_distances_batch(points[0], points[1], exact_amenities)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    raster = calculate_distances_batch(points[0], points[1], raster_amenities)
+    raster_time = time.perf_counter() - start
+    stats = compare(exact, raster)
+    any_disagreement = np.mean(np.any([exact[name] != raster[name] for name in exact], axis=0))
+    print(
+        f"{title}: {points.shape[1]} points, exact {exact_time * 1e6 / points.shape[1]:.2f} us/point, "
+        f"raster {raster_time * 1e6 / points.shape[1]:.2f} us/point, any column differs for {any_disagreement:.2%}"
+    )
+    for name, values in stats.items():
+        print(f"  {name:<16} disagreement {values['disagreement']:.3%}, max abs diff {values['max_abs_diff']:.0f}")
+
+
+def main() -> None:
+    """Build report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--raster", required=True, help="Directory with amenity raster")
+    parser.add_argument("--amenity-dir", default="src/static/amenity")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    raster_amenities = load_amenities_data(args.amenity_dir, raster_path=args.raster)
+    exact_amenities = replace(raster_amenities, raster=None)
+    assert raster_amenities.raster is not None
+    raster = raster_amenities.raster
+    print(f"raster: {raster.counts.shape[0]}x{raster.counts.shape[1]} cells of {raster.cell_size:.0f} m, "
+          f"error bound: amenities within {raster.cell_size / sqrt(2):.1f} m of a radius")
+
+    rows = rng.integers(0, raster.counts.shape[0], args.points)
+    cols = rng.integers(0, raster.counts.shape[1], args.points)
+    centers = np.stack((raster.lat0 + rows * raster.lat_step, raster.lon0 + cols * raster.lon_step))
+    print_report("cell centers", exact_amenities, raster_amenities, centers)
+    print_report("uniform in circle", exact_amenities, raster_amenities, random_circle_points(args.points, rng))
+    near = rng.integers(0, len(exact_amenities), args.points)
+    offsets = rng.normal(0, 0.01, (2, args.points))
+    near_points = np.stack((exact_amenities.lat[near], exact_amenities.lon[near])) * 180.0 / pi + offsets
+    print_report("near amenities", exact_amenities, raster_amenities, near_points)
+
+
+if __name__ == "__main__":
+    main()
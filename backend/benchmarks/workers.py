@@ -0,0 +1,182 @@
+"""Throughput and memory of the service served by gunicorn with different count of workers.
+
+Starts gunicorn with gunicorn.conf.py and a locally trained CatBoost model for every count of workers,
+sends requests with coordinates and reports throughput, latency percentiles and memory of every worker.
+PSS divides shared pages between the processes mapping them, so total PSS is the real memory of workers.
+Run from the backend directory:
+
+    python -m benchmarks.workers --workers 1 2 4 8 --requests 4000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+import numpy as np
+
+from benchmarks.common import get_free_port, percentiles, random_apartment, train_local_model
+from src.utils.memory import get_memory_usage
+
+
+def get_worker_pids(master_pid: int) -> List[int]:
+    """Get ids of processes forked by gunicorn master.
+
+    Parameters
+    ----------
+     master_pid: int
+
+    Returns
+    -------
+     ids of workers: List[int]
+
+    """
+    with open(f"/proc/{master_pid}/task/{master_pid}/children", encoding="utf-8") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+async def wait_ready(url: str, workers: int, timeout: float) -> None:
+    """Wait until all workers are warmed up.
+
+    Requests are spread between workers by the kernel, so all of them are considered ready after
+    many consecutive successful readiness checks.
+
+    Parameters
+    ----------
+     url: url of service
+     workers: count of workers
+     timeout: seconds
+
+    Returns
+    -------
+     nothing
+
+    """
+    deadline = time.monotonic() + timeout
+    successes = 0
+    async with aiohttp.ClientSession() as session:
+        while successes < 20 * workers:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Service is not ready")
+            try:
+                async with session.get(f"{url}/health/ready") as response:
+                    successes = successes + 1 if response.status == 200 else 0
+            except aiohttp.ClientConnectionError:
+                successes = 0
+            if successes == 0:
+                await asyncio.sleep(0.2)
+
+
+async def run_load(url: str, requests: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    """Send requests with coordinates and measure throughput.
+
+    Parameters
+    ----------
+     url: url of service
+     requests: total count of requests
+     concurrency: count of concurrent clients
+     seed: int
+
+    Returns
+    -------
+     throughput and latency percentiles: Dict[str, Any]
+
+    """
+    rng = np.random.default_rng(seed)
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(random_apartment(rng))
+    latencies: List[float] = []
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            async with session.post(f"{url}/api/predict_with_coordinates", json=body) as response:
+                await response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"predict_with_coordinates returned {response.status}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*[client(session) for _ in range(concurrency)])
+    duration = time.perf_counter() - start
+    return {"throughput_rps": requests / duration, **percentiles(latencies)}
+
+
+def benchmark_workers(workers: int, env: Dict[str, str], args: argparse.Namespace) -> None:
+    """Start gunicorn, run load and print results.
+
+    Parameters
+    ----------
+     workers: count of workers
+     env: environment of the service
+     args: argparse.Namespace
+
+    Returns
+    -------
+     nothing
+
+    """
+    port = get_free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(env, WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "src.app:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(wait_ready(url, workers, args.startup_timeout))
+        result = asyncio.run(run_load(url, args.requests, args.concurrency, args.seed))
+        memory = [get_memory_usage(pid) for pid in get_worker_pids(process.pid)]
+    finally:
+        process.terminate()
+        process.wait()
+    print(
+        f"{workers} workers: {result['throughput_rps']:.0f} req/s, p50 {result['p50_ms']:.1f} ms, "
+        f"p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+    )
+    for kind in ("rss", "pss", "private"):
+        values = [usage[kind] / 2 ** 20 for usage in memory]
+        print(f"  {kind:<8} per worker {np.mean(values):.0f} MiB, total {np.sum(values):.0f} MiB")
+
+
+def main() -> None:
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--amenity-dir", default="src/static/amenity")
+    parser.add_argument("--snapshot", default="", help="Directory with amenity snapshot")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"cpu count: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.cbm")
+        train_local_model(model_path)
+        env = dict(
+            os.environ,
+            MODEL_PATH=model_path,
+            MODEL_FLAVOR="catboost",
+            AMENITY_DIR_PATH=args.amenity_dir,
+            AMENITY_SNAPSHOT_PATH=args.snapshot,
+            PREDICTION_EXECUTOR="inline",
+            CATBOOST_THREAD_COUNT="1",
+        )
+        for workers in args.workers:
+            benchmark_workers(workers, env, args)
+
+
+if __name__ == "__main__":
+    main()
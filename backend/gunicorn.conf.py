@@ -0,0 +1,60 @@
+"""Config of gunicorn serving the application with several uvicorn workers.
+
+Model and amenities are loaded in the master process before workers are forked, so workers share them
+copy-on-write instead of loading a copy each. Count of workers is set by WEB_CONCURRENCY. Metrics of workers
+are written to files in PROMETHEUS_MULTIPROC_DIR and merged on every scrape of /metrics.
+"""
+
+import glob
+import os
+import tempfile
+
+# prometheus_client chooses storage of values on import, so the directory is set before the application is loaded
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    # files of the previous run would be merged with metrics of new workers
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+else:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5005")
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server) -> None:  # type: ignore[no-untyped-def]
+    """Load shared state after the application is imported and before workers are forked.
+
+    Parameters
+    ----------
+     server: gunicorn.arbiter.Arbiter
+
+    Returns
+    -------
+     nothing
+
+    """
+    from src.config import app_config
+    from src.utils.preload import preload_shared_state
+
+    preload_shared_state(app_config)
+    server.log.info("Loaded shared state for %s workers", workers)
+
+
+def child_exit(server, worker) -> None:  # type: ignore[no-untyped-def]
+    """Remove live gauges of exited worker from merged metrics.
+
+    Parameters
+    ----------
+     server: gunicorn.arbiter.Arbiter
+     worker: gunicorn.workers.base.Worker
+
+    Returns
+    -------
+     nothing
+
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)  # type: ignore[no-untyped-call]
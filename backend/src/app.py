@@ -1,6 +1,9 @@
 """Main module for running application."""
 
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
+from functools import partial
 from typing import AsyncIterator
 
 from fastapi import FastAPI, Request, Response
@@ -10,9 +13,19 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from src.config import app_config
 from src.exceptions import ApplicationException
 from src.logger import logger
+from src.router.health import router as health_router
 from src.router.predict import router as predict_router
-from src.utils.amenity import load_amenities_data
-from src.utils.models import load_model
+from src.utils.batching import PredictionBatcher
+from src.utils.executor import PredictionExecutor
+from src.utils.geoapify import GeoapifyClient
+from src.utils.geocoding_cache import GeocodingCache
+from src.utils.memory import MULTIPROCESS, refresh_memory_usage
+from src.utils.model_reload import ModelReloader, set_served_version
+from src.utils.model_router import ModelRouter
+from src.utils.models import get_model_config, get_model_registry, load_model
+from src.utils.prediction_cache import PredictionCache
+from src.utils.preload import get_shared_state
+from src.utils.warm_up import warm_up_application
 
 
 @asynccontextmanager
@@ -28,11 +41,102 @@ async def lifespan(application: FastAPI) -> AsyncIterator[None]:
      nothing
     
     """
-    application.state.model = load_model(app_config)
-    logger.info("Loaded model from mlflow")
-    application.state.amenities_data = load_amenities_data(app_config.AMENITY_DIR_PATH)
-    logger.info("Loaded amenities data from static dir")
+    application.state.ready = False
+    registry = get_model_registry(app_config)
+    # state is preloaded in the master process when the application is served by gunicorn
+    shared_state = get_shared_state(app_config)
+    application.state.model = shared_state.model
+    application.state.model_version = shared_state.model_version
+    set_served_version(shared_state.model_version)
+    application.state.amenities_data = shared_state.amenities_data
+    create_executor = partial(
+        PredictionExecutor,
+        app_config.PREDICTION_EXECUTOR,
+        app_config.PREDICTION_EXECUTOR_WORKERS,
+        amenities_loader=shared_state.amenities_loader,
+    )
+    application.state.executor = create_executor(shared_state.model_loader)
+    logger.info(f"Created {app_config.PREDICTION_EXECUTOR} prediction executor")
+    application.state.geoapify_client = GeoapifyClient(
+        pool_size=app_config.GEOAPIFY_POOL_SIZE,
+        concurrency=app_config.GEOAPIFY_CONCURRENCY,
+        timeout=app_config.GEOAPIFY_TIMEOUT_S,
+        dns_cache_ttl=app_config.GEOAPIFY_DNS_CACHE_TTL_S,
+        keepalive_timeout=app_config.GEOAPIFY_KEEPALIVE_S,
+    )
+    application.state.geocoding_cache = None
+    if app_config.GEOCODING_CACHE_SIZE > 0 or app_config.GEOCODING_CACHE_SQLITE_PATH:
+        application.state.geocoding_cache = GeocodingCache(
+            app_config.GEOCODING_CACHE_SIZE,
+            ttl=app_config.GEOCODING_CACHE_TTL_S,
+            negative_ttl=app_config.GEOCODING_CACHE_NEGATIVE_TTL_S,
+            sqlite_path=app_config.GEOCODING_CACHE_SQLITE_PATH,
+        )
+    application.state.prediction_cache = None
+    if app_config.PREDICTION_CACHE_SIZE > 0:
+        application.state.prediction_cache = PredictionCache(
+            app_config.PREDICTION_CACHE_SIZE, app_config.PREDICTION_CACHE_COORDINATE_DECIMALS
+        )
+    application.state.batcher = None
+    if app_config.MICRO_BATCHING_ENABLED:
+        application.state.batcher = PredictionBatcher(
+            lambda data, lats, lons: application.state.executor.predict(
+                application.state.model, application.state.amenities_data, data, lats, lons
+            ),
+            window=app_config.MICRO_BATCHING_WINDOW_MS / 1000,
+            max_size=app_config.MICRO_BATCHING_MAX_SIZE,
+        )
+        application.state.batcher.start()
+        logger.info("Started micro-batching of predictions")
+    application.state.model_router = None
+    extra_models = list(app_config.SHADOW_MODELS)
+    if app_config.CANDIDATE_MODEL:
+        extra_models.append(app_config.CANDIDATE_MODEL)
+    if extra_models:
+        application.state.model_router = ModelRouter(
+            application.state,
+            {spec: load_model(get_model_config(app_config, spec)) for spec in extra_models},
+            candidate=app_config.CANDIDATE_MODEL,
+            candidate_fraction=app_config.CANDIDATE_FRACTION,
+            shadows=app_config.SHADOW_MODELS,
+            shadow_fraction=app_config.SHADOW_FRACTION,
+            workers=app_config.PREDICTION_EXECUTOR_WORKERS,
+            max_pending=app_config.SHADOW_MAX_PENDING,
+        )
+        logger.info(f"Loaded additional models: {', '.join(extra_models)}")
+    application.state.reloader = None
+    if app_config.MODEL_RELOAD_INTERVAL_S > 0:
+        application.state.reloader = ModelReloader(
+            application.state,
+            registry,
+            interval=app_config.MODEL_RELOAD_INTERVAL_S,
+            warm_up_requests=app_config.MODEL_WARM_UP_REQUESTS,
+            create_executor=create_executor,
+        )
+        application.state.reloader.start()
+        logger.info("Started polling of model registry")
+    warm_up_task = asyncio.create_task(warm_up_application(application.state, app_config.MODEL_WARM_UP_REQUESTS))
+    memory_task = asyncio.create_task(refresh_memory_usage()) if MULTIPROCESS else None
     yield
+    application.state.ready = False
+    # warm-up uses the executor, so it is finished before the executor is shut down
+    warm_up_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warm_up_task
+    if memory_task is not None:
+        memory_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await memory_task
+    if application.state.reloader is not None:
+        await application.state.reloader.stop()
+    if application.state.model_router is not None:
+        application.state.model_router.close()
+    if application.state.batcher is not None:
+        await application.state.batcher.stop()
+    application.state.executor.shutdown()
+    if application.state.geocoding_cache is not None:
+        application.state.geocoding_cache.close()
+    await application.state.geoapify_client.close()
 
 app = FastAPI(
     lifespan=lifespan,
@@ -40,6 +144,7 @@ app = FastAPI(
     description="This service allows to predict the price of an apartment in the city of Moscow",
 )
 app.include_router(predict_router, prefix="/api")
+app.include_router(health_router, prefix="/health")
 Instrumentator().instrument(app).expose(app, tags=["monitoring"])
 
 
@@ -1,5 +1,7 @@
 """Module for config."""
 
+from typing import List, Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,7 +9,15 @@ class Config(BaseSettings):
     """Class for loading the necessary env variables."""
     
     GEOAPIFY_TOKEN: str = ""
+    GEOAPIFY_POOL_SIZE: int = 100
+    GEOAPIFY_CONCURRENCY: int = 50
+    GEOAPIFY_TIMEOUT_S: float = 5.0
+    GEOAPIFY_DNS_CACHE_TTL_S: int = 300
+    GEOAPIFY_KEEPALIVE_S: float = 30.0
     AMENITY_DIR_PATH: str = ""
+    AMENITY_SNAPSHOT_PATH: str = ""
+    AMENITY_COUNT_MODE: Literal["exact", "raster"] = "exact"
+    AMENITY_RASTER_PATH: str = ""
     
     MLFLOW_TRACKING_URI: str = ""
     MLFLOW_S3_ENDPOINT_URL: str = ""
@@ -15,6 +25,40 @@ class Config(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = ""
     MODEL_NAME: str = ""
     MODEL_VERSION: str = ""
+    MODEL_FLAVOR: Literal["pyfunc", "catboost"] = "pyfunc"
+    MODEL_PATH: str = ""
+    CATBOOST_THREAD_COUNT: int = -1
+    MODEL_CACHE_DIR: str = ""
+    MODEL_CACHE_MAX_VERSIONS: int = 3
+    MODEL_CACHE_OFFLINE_FALLBACK: bool = False
+    MODEL_ALIAS: str = ""
+    MODEL_REGISTRY_PATH: str = ""
+    MODEL_RELOAD_INTERVAL_S: float = 0.0
+    MODEL_WARM_UP_REQUESTS: int = 16
+    CANDIDATE_MODEL: str = ""
+    CANDIDATE_FRACTION: float = 0.0
+    SHADOW_MODELS: List[str] = []
+    SHADOW_FRACTION: float = 0.0
+    SHADOW_MAX_PENDING: int = 100
+
+    PREDICT_BATCH_MAX_SIZE: int = 10000
+    GEOCODING_BATCH_CONCURRENCY: int = 10
+    GEOCODING_CACHE_SIZE: int = 10000
+    GEOCODING_CACHE_TTL_S: float = 86400.0
+    GEOCODING_CACHE_NEGATIVE_TTL_S: float = 600.0
+    GEOCODING_CACHE_SQLITE_PATH: str = ""
+
+    PREDICTION_EXECUTOR: Literal["inline", "thread", "process"] = "inline"
+    PREDICTION_EXECUTOR_WORKERS: int = 4
+
+    MICRO_BATCHING_ENABLED: bool = False
+    MICRO_BATCHING_WINDOW_MS: float = 3.0
+    MICRO_BATCHING_MAX_SIZE: int = 32
+
+    PREDICTION_CACHE_SIZE: int = 0
+    PREDICTION_CACHE_COORDINATE_DECIMALS: int = 5
+
+    STAGE_METRICS_ENABLED: bool = True
 
     LOGGING_URL: str = ""
     
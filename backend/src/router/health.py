@@ -0,0 +1,35 @@
+"""Endpoints for health checks."""
+
+from fastapi import APIRouter, Request, Response, status
+
+router = APIRouter(tags=['health'])
+
+
+@router.get("/live")
+async def live() -> Response:
+    """Report that the application is running.
+
+    Returns
+    -------
+     Response
+
+    """
+    return Response(status_code=status.HTTP_200_OK)
+
+
+@router.get("/ready")
+async def ready(request: Request) -> Response:
+    """Report whether model, amenities and warm-up are done.
+
+    Parameters
+    ----------
+     request: Request
+
+    Returns
+    -------
+     Response
+
+    """
+    if getattr(request.app.state, "ready", False):
+        return Response(status_code=status.HTTP_200_OK)
+    return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
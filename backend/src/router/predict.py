@@ -1,25 +1,43 @@
 """Endpoints for prediction."""
 
-from typing import Dict
+import asyncio
+import time
+from typing import Dict, List, Sequence
 
 from fastapi import APIRouter, Body, Request, status
 
 from src.config import app_config
-from src.exceptions import GeocodingError
-from src.schemas.predict import BasePredictionIn, PredictionOut, PredictionWithAddressIn, PredictionWithCoordinatesIn
-from src.utils.amenity import calculate_distances
-from src.utils.feature_preparing import make_features_dataframe
+from src.exceptions import ApplicationException, GeocodingError
+from src.schemas.predict import (
+    BasePredictionIn,
+    PredictionBatchIn,
+    PredictionBatchItemOut,
+    PredictionBatchOut,
+    PredictionOut,
+    PredictionWithAddressIn,
+    PredictionWithCoordinatesIn,
+)
+from src.utils.batching import PredictionBatcher
+from src.utils.executor import PredictionExecutor
 from src.utils.geoapify import (
     Coordinates,
     FetchException,
+    GeoapifyClient,
     IncorrectQueryException,
     NoResultsException,
     NoTokenException,
-    get_coordinates_by_address,
 )
+from src.utils.geocoding_cache import GeocodingCache, get_cached_coordinates
+from src.utils.model_router import PREDICTION_TIME, PRIMARY_MODEL, SERVED_PREDICTIONS, ModelRouter
+from src.utils.prediction_cache import PredictionCache
+from src.utils.single_flight import SingleFlight
+from src.utils.stages import measure_stage
 
 router = APIRouter(tags=['ml'])
 
+APARTMENT_FIELDS = set(BasePredictionIn.model_fields)
+prediction_flights: SingleFlight[float] = SingleFlight("prediction")
+
 @router.post("/predict_with_address", response_model=PredictionOut)
 async def predict_with_address(request: Request, data: PredictionWithAddressIn = Body()) -> PredictionOut:
     """Prediction with address.
@@ -34,8 +52,10 @@ async def predict_with_address(request: Request, data: PredictionWithAddressIn =
      prediction result: PredictionOut
     
     """
-    coords = await get_coordinates_with_handling_errors(data.address, app_config.GEOAPIFY_TOKEN)
-    prediction = prepare_and_predict(request, data, coords.lat, coords.lon)
+    coords = await get_coordinates_with_handling_errors(
+        data.address, app_config.GEOAPIFY_TOKEN, request.app.state.geocoding_cache, request.app.state.geoapify_client
+    )
+    prediction = await prepare_and_predict(request, data, coords.lat, coords.lon)
     return PredictionOut(value=prediction)
 
 
@@ -53,12 +73,68 @@ async def predict_with_coordinates(request: Request, data: PredictionWithCoordin
      prediction result: PredictionOut
     
     """
-    prediction = prepare_and_predict(request, data, data.lat, data.lon)
+    prediction = await prepare_and_predict(request, data, data.lat, data.lon)
     return PredictionOut(value=prediction)
 
 
-def prepare_and_predict(request: Request, data: BasePredictionIn, lat: float, lon: float) -> float:
+@router.post("/predict_batch", response_model=PredictionBatchOut)
+async def predict_batch(request: Request, data: PredictionBatchIn = Body()) -> PredictionBatchOut:
+    """Predict for batch of apartments with one model call.
+
+    Items which can't be geocoded get error instead of value.
+
+    Parameters
+    ----------
+     request: Request
+     data: batch of coordinates and address data
+
+    Returns
+    -------
+     prediction results: PredictionBatchOut
+
+    """
+    if len(data.items) + len(data.address_items) > app_config.PREDICT_BATCH_MAX_SIZE:
+        raise ApplicationException(
+            message=f"Превышен максимальный размер пакета: {app_config.PREDICT_BATCH_MAX_SIZE}",
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    semaphore = asyncio.Semaphore(app_config.GEOCODING_BATCH_CONCURRENCY)
+    geocoding_results = await asyncio.gather(
+        *[
+            get_batch_item_coordinates(
+                item.address, semaphore, request.app.state.geocoding_cache, request.app.state.geoapify_client
+            )
+            for item in data.address_items
+        ]
+    )
+    apartments: List[BasePredictionIn] = list(data.items)
+    lats = [item.lat for item in data.items]
+    lons = [item.lon for item in data.items]
+    for item, coords in zip(data.address_items, geocoding_results):
+        if isinstance(coords, Coordinates):
+            apartments.append(item)
+            lats.append(coords.lat)
+            lons.append(coords.lon)
+    values = iter(await prepare_and_predict_batch(request, apartments, lats, lons))
+
+    items = [PredictionBatchItemOut(value=next(values)) for _ in data.items]
+    address_items = [
+        PredictionBatchItemOut(value=next(values))
+        if isinstance(coords, Coordinates)
+        else PredictionBatchItemOut(error=coords.message)
+        for coords in geocoding_results
+    ]
+    return PredictionBatchOut(items=items, address_items=address_items)
+
+
+async def prepare_and_predict(request: Request, data: BasePredictionIn, lat: float, lon: float) -> float:
     """Prepare features and make prediction.
+
+    Prediction is queued to the batcher if micro-batching is enabled, concurrent identical predictions
+    are made once. If prediction cache is enabled, predictions of the primary model are cached for its current
+    version by rounded coordinates, features of uncached predictions are prepared from exact coordinates.
+    If there are additional models, a share of requests is served by candidate model and a share is mirrored
+    to shadow models.
     
     Parameters
     ----------
@@ -71,20 +147,67 @@ def prepare_and_predict(request: Request, data: BasePredictionIn, lat: float, lo
     -------
      prediction result: float
     
-    """  
-    distance_data = calculate_distances(lat, lon, request.app.state.amenities_data)
-    df = make_features_dataframe(data, lat, lon, distance_data)
-    values: list[float] = request.app.state.model.predict(df)
-    return values[0]
+    """
+    cache: PredictionCache | None = request.app.state.prediction_cache
+    model_router: ModelRouter | None = request.app.state.model_router
+    name = model_router.choose() if model_router is not None else PRIMARY_MODEL
+    if name != PRIMARY_MODEL:
+        cache = None
+    version: str = request.app.state.model_version if name == PRIMARY_MODEL else name
+    apartment = data.model_dump_json(include=APARTMENT_FIELDS)
+    key = (version, apartment, lat, lon)
+    cache_key = (version, apartment, *cache.quantize(lat, lon)) if cache is not None else key
+    value = cache.get(version, cache_key) if cache is not None else None
+    if value is None:
+        value = await prediction_flights.run(key, lambda: predict_apartment(request, name, data, lat, lon))
+        if cache is not None:
+            cache.put(version, cache_key, value)
+    SERVED_PREDICTIONS.labels(model=name).inc()
+    if model_router is not None:
+        model_router.mirror(data, lat, lon, value)
+    return value
+
+
+async def predict_apartment(request: Request, name: str, data: BasePredictionIn, lat: float, lon: float) -> float:
+    """Make prediction for one apartment with candidate model or with the batcher or the executor.
+
+    Parameters
+    ----------
+     request: Request
+     name: name of model or PRIMARY_MODEL
+     data: user data
+     lat: latitude
+     lon: longitude
+
+    Returns
+    -------
+     prediction result: float
 
+    """
+    if name != PRIMARY_MODEL:
+        model_router: ModelRouter = request.app.state.model_router
+        return await model_router.predict(name, data, lat, lon)
+    start = time.perf_counter()
+    batcher: PredictionBatcher | None = request.app.state.batcher
+    if batcher is not None:
+        value = await batcher.predict(data, lat, lon)
+    else:
+        value = (await prepare_and_predict_batch(request, [data], [lat], [lon]))[0]
+    PREDICTION_TIME.labels(model=PRIMARY_MODEL).observe(time.perf_counter() - start)
+    return value
 
-async def get_coordinates_with_handling_errors(address: str, token: str) -> Coordinates:
+
+async def get_coordinates_with_handling_errors(
+    address: str, token: str, cache: GeocodingCache | None = None, client: GeoapifyClient | None = None
+) -> Coordinates:
     """Get coordinates and handle errors.
     
     Parameters
     ----------
      address: str
      token: str
+     cache: geocoding cache or None if caching is disabled
+     client: shared Geoapify client
     
     Returns
     -------
@@ -92,7 +215,8 @@ async def get_coordinates_with_handling_errors(address: str, token: str) -> Coor
     
     """
     try:
-        coords = await get_coordinates_by_address(address, token)
+        with measure_stage("geocoding"):
+            coords = await get_cached_coordinates(address, token, cache, client)
     except (NoResultsException, IncorrectQueryException) as ex:
         raise GeocodingError(message="Пожалуйста уточните адрес", status=status.HTTP_404_NOT_FOUND) from ex
     except NoTokenException:
@@ -103,4 +227,52 @@ async def get_coordinates_with_handling_errors(address: str, token: str) -> Coor
         raise GeocodingError(
             message="Возникла ошибка при обращении к geoapify", status=status.HTTP_500_INTERNAL_SERVER_ERROR
         ) from FetchException
-    return coords
\ No newline at end of file
+    return coords
+
+
+async def prepare_and_predict_batch(
+    request: Request, data: Sequence[BasePredictionIn], lats: Sequence[float], lons: Sequence[float]
+) -> List[float]:
+    """Prepare features and make prediction for many apartments with one model call in the executor.
+
+    Parameters
+    ----------
+     request: Request
+     data: user data for every apartment
+     lats: latitudes
+     lons: longitudes
+
+    Returns
+    -------
+     prediction results: List[float]
+
+    """
+    executor: PredictionExecutor = request.app.state.executor
+    return await executor.predict(request.app.state.model, request.app.state.amenities_data, data, lats, lons)
+
+
+async def get_batch_item_coordinates(
+    address: str,
+    semaphore: asyncio.Semaphore,
+    cache: GeocodingCache | None = None,
+    client: GeoapifyClient | None = None,
+) -> Coordinates | GeocodingError:
+    """Get coordinates for batch item returning error instead of raising it.
+
+    Parameters
+    ----------
+     address: str
+     semaphore: limit of concurrent geocoding requests
+     cache: geocoding cache or None if caching is disabled
+     client: shared Geoapify client
+
+    Returns
+    -------
+     coordinates or error: Coordinates | GeocodingError
+
+    """
+    async with semaphore:
+        try:
+            return await get_coordinates_with_handling_errors(address, app_config.GEOAPIFY_TOKEN, cache, client)
+        except GeocodingError as ex:
+            return ex
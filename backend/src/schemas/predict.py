@@ -1,6 +1,7 @@
 """Module with schemas."""
 
 from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -70,4 +71,25 @@ class PredictionWithCoordinatesIn(BasePredictionIn):
 class PredictionOut(BaseModel):
     """Prediction result."""
 
-    value: float
\ No newline at end of file
+    value: float
+
+
+class PredictionBatchIn(BaseModel):
+    """Batch of apartments for prediction."""
+
+    items: List[PredictionWithCoordinatesIn] = []
+    address_items: List[PredictionWithAddressIn] = []
+
+
+class PredictionBatchItemOut(BaseModel):
+    """Prediction result or error for one apartment of batch."""
+
+    value: Optional[float] = None
+    error: Optional[str] = None
+
+
+class PredictionBatchOut(BaseModel):
+    """Batch prediction result in the order of input items."""
+
+    items: List[PredictionBatchItemOut]
+    address_items: List[PredictionBatchItemOut]
@@ -2,84 +2,374 @@
 
 import json
 import os
+from dataclasses import dataclass, replace
+from itertools import chain
 from math import asin, cos, pi, sin, sqrt
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from scipy.spatial import cKDTree
+
+from src.utils.amenity_raster import AmenityRaster, load_amenity_raster
 
 DISTANCES = [500, 1500, 3000]
+EARTH_RADIUS = 6372795
+# distances closer than this to a radius are rechecked with the scalar formula,
+# so the vectorized counts are identical to the ones of get_distance
+BORDER_TOLERANCE = 1e-3
+# margin of the spatial index search radius, candidates are filtered with the exact formula
+INDEX_MARGIN = 1.0
+# files of snapshot compiled by research/src/features/compile_amenities.py
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_INDEX_FILE = "index.json"
+SNAPSHOT_RADIANS_FILE = "radians.npy"
+SNAPSHOT_XYZ_FILE = "xyz.npy"
+
+
+@dataclass(frozen=True)
+class Amenities:
+    """Amenity coordinates in radians stored as contiguous arrays grouped by type."""
+
+    types: Tuple[str, ...]
+    codes: npt.NDArray[np.intp]
+    lat: npt.NDArray[np.float64]
+    lon: npt.NDArray[np.float64]
+    cos_lat: npt.NDArray[np.float64]
+    tree: cKDTree
+    raster: Optional[AmenityRaster] = None
+
+    def __len__(self) -> int:
+        """Get count of amenities.
+
+        Returns
+        -------
+         count: int
+
+        """
+        return len(self.codes)
+
+
+def build_amenities(coordinates: Dict[str, List[Tuple[float, float]]]) -> Amenities:
+    """Build amenity arrays.
+
+    Parameters
+    ----------
+     coordinates: dict with amenity type as key and list of (lat, lon) in degrees as value
+
+    Returns
+    -------
+     amenities: Amenities
+
+    """
+    types = tuple(name for name in coordinates if coordinates[name])
+    codes = np.concatenate(
+        [np.full(len(coordinates[name]), code, dtype=np.intp) for code, name in enumerate(types)]
+        or [np.empty(0, dtype=np.intp)]
+    )
+    points = np.array([point for name in types for point in coordinates[name]], dtype=np.float64).reshape(-1, 2)
+    # the same operations as in get_distance, so radians are bit-identical
+    lat = np.ascontiguousarray(points[:, 0] * pi / 180.0)
+    lon = np.ascontiguousarray(points[:, 1] * pi / 180.0)
+    cos_lat = np.cos(lat)
+    # points on the unit sphere, euclidean distance between them is the chord of the arc
+    xyz = np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+    return Amenities(types=types, codes=codes, lat=lat, lon=lon, cos_lat=cos_lat, tree=cKDTree(xyz))
+
+
+def get_chord_length(distance: float) -> float:
+    """Convert distance on the earth surface to chord length on the unit sphere.
+
+    Parameters
+    ----------
+     distance: distance in meters
+
+    Returns
+    -------
+     chord length: float
+
+    """
+    return 2 * sin(min(distance / EARTH_RADIUS, pi) / 2)
+
 
+def calculate_distances(lat: float, lon: float, amenities: Amenities) -> Dict[str, int]:
+    """Count amenities of every type within DISTANCES from point.
 
-def calculate_distances(lat: float, lon: float, amenities: List[Dict[str, float | str]]) -> Dict[str, int]:
-    """Calculate distances from point to all amenities.
-    
     Parameters
     ----------
      lat: float
      lon: float
-     amenities: List[Dict[str, float | str]]
-    
+     amenities: Amenities
+
     Returns
     -------
      distances: Dict[str, int]
-    
+
+    """
+    distance_data = calculate_distances_batch(np.array([lat]), np.array([lon]), amenities)
+    return {key: int(counts[0]) for key, counts in distance_data.items()}
+
+
+def calculate_distances_batch(
+    lat: npt.NDArray[np.float64], lon: npt.NDArray[np.float64], amenities: Amenities
+) -> Dict[str, npt.NDArray[np.int64]]:
+    """Count amenities of every type within DISTANCES from every point.
+
+    Counts of points inside the raster are taken from it if amenities have one, other points are counted exactly.
+
+    Parameters
+    ----------
+     lat: latitudes of points
+     lon: longitudes of points
+     amenities: Amenities
+
+    Returns
+    -------
+     counts for every point: Dict[str, npt.NDArray[np.int64]]
+
+    """
+    if amenities.raster is None:
+        return calculate_exact_distances_batch(lat, lon, amenities)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    inside, raster_data = amenities.raster.lookup(lat, lon)
+    if inside.all():
+        return raster_data
+    outside = ~inside
+    exact_data = calculate_exact_distances_batch(lat[outside], lon[outside], amenities)
+    distance_data: Dict[str, npt.NDArray[np.int64]] = dict()
+    for name, values in exact_data.items():
+        counts = np.empty(len(lat), dtype=np.int64)
+        counts[inside] = raster_data[name]
+        counts[outside] = values
+        distance_data[name] = counts
+    return distance_data
+
+
+def calculate_exact_distances_batch(
+    lat: npt.NDArray[np.float64], lon: npt.NDArray[np.float64], amenities: Amenities
+) -> Dict[str, npt.NDArray[np.int64]]:
+    """Count amenities of every type within DISTANCES from every point.
+
+    Only amenities found by the spatial index near the points are checked.
+
+    Parameters
+    ----------
+     lat: latitudes of points
+     lon: longitudes of points
+     amenities: Amenities
+
+    Returns
+    -------
+     counts for every point: Dict[str, npt.NDArray[np.int64]]
+
+    """
+    lat1 = np.asarray(lat, dtype=np.float64) * pi / 180.0
+    long1 = np.asarray(lon, dtype=np.float64) * pi / 180.0
+    cos_lat1 = np.cos(lat1)
+    points = np.column_stack((cos_lat1 * np.cos(long1), cos_lat1 * np.sin(long1), np.sin(lat1)))
+    radius = get_chord_length(max(DISTANCES) + INDEX_MARGIN)
+    neighbours = amenities.tree.query_ball_point(points, radius, return_sorted=False)
+    sizes = [len(item) for item in neighbours]
+    rows = np.repeat(np.arange(len(lat1), dtype=np.intp), sizes)
+    indices = np.fromiter(chain.from_iterable(neighbours), dtype=np.intp, count=sum(sizes))
+    return count_amenities(lat1, long1, amenities, rows, indices)
+
+
+def count_amenities(
+    lat1: npt.NDArray[np.float64],
+    long1: npt.NDArray[np.float64],
+    amenities: Amenities,
+    rows: npt.NDArray[np.intp],
+    indices: npt.NDArray[np.intp],
+) -> Dict[str, npt.NDArray[np.int64]]:
+    """Count amenities of every type within DISTANCES from points checking only selected pairs.
+
+    Parameters
+    ----------
+     lat1: latitudes of points in radians
+     long1: longitudes of points in radians
+     amenities: Amenities
+     rows: point of every pair
+     indices: amenity of every pair
+
+    Returns
+    -------
+     counts for every point: Dict[str, npt.NDArray[np.int64]]
+
     """
-    distance_data: Dict[str, int] = dict()
-    for amenity_item in amenities:
-        calculated_distance = get_distance(lon, lat, float(amenity_item['lon']), float(amenity_item['lat']))
-        for distance in DISTANCES:
-            key: str = str(amenity_item['type']) + '_' + str(distance)
-            distance_data[key] = distance_data.get(key, 0)
-            if calculated_distance < distance:
-                distance_data[key] += 1
+    type_count = len(amenities.types)
+    cells = rows * type_count + amenities.codes[indices]
+    lat2 = amenities.lat[indices]
+    long2 = amenities.lon[indices]
+    distances = haversine(lat1[rows], long1[rows], lat2, long2, amenities.cos_lat[indices])
+    distance_data: Dict[str, npt.NDArray[np.int64]] = dict()
+    for distance in DISTANCES:
+        counts = np.bincount(cells[distances < distance - BORDER_TOLERANCE], minlength=len(lat1) * type_count)
+        border = np.flatnonzero(np.abs(distances - distance) <= BORDER_TOLERANCE)
+        for pair in border:
+            row = rows[pair]
+            if get_radian_distance(long1[row], lat1[row], long2[pair], lat2[pair]) < distance:
+                counts[cells[pair]] += 1
+        counts = counts.reshape(len(lat1), type_count)
+        for code, name in enumerate(amenities.types):
+            distance_data[name + '_' + str(distance)] = counts[:, code].astype(np.int64)
     return distance_data
 
 
+def haversine(
+    lat1: npt.NDArray[np.float64],
+    long1: npt.NDArray[np.float64],
+    lat2: npt.NDArray[np.float64],
+    long2: npt.NDArray[np.float64],
+    cos_lat2: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Calculate distances between pairs of points.
+
+    Parameters
+    ----------
+     lat1: latitudes in radians
+     long1: longitudes in radians
+     lat2: latitudes in radians
+     long2: longitudes in radians
+     cos_lat2: cosines of lat2
+
+    Returns
+    -------
+     distances in meters: npt.NDArray[np.float64]
+
+    """
+    delta_long = long2 - long1
+    delta_lat = lat2 - lat1
+    ad = 2 * np.arcsin(np.sqrt(np.sin(delta_lat / 2) ** 2 + np.cos(lat1) * cos_lat2 * np.sin(delta_long / 2) ** 2))
+    distances: npt.NDArray[np.float64] = ad * EARTH_RADIUS
+    return distances
+
+
 def get_distance(llong1: float, llat1: float, llong2: float, llat2: float) -> float:
     """Calculate distance.
-    
+
     Parameters
     ----------
      llong1: float
      llat1: float
      llon2: float
      llat2: float
-    
+
     Returns
     -------
      distance in meters: float
-    
+
     """
-    rad = 6372795
     lat1 = llat1 * pi / 180.0
     lat2 = llat2 * pi / 180.0
     long1 = llong1 * pi / 180.0
     long2 = llong2 * pi / 180.0
+    return get_radian_distance(long1, lat1, long2, lat2)
+
+
+def get_radian_distance(long1: float, lat1: float, long2: float, lat2: float) -> float:
+    """Calculate distance between points given in radians.
+
+    Parameters
+    ----------
+     long1: float
+     lat1: float
+     long2: float
+     lat2: float
+
+    Returns
+    -------
+     distance in meters: float
+
+    """
     delta_long = long2 - long1
     delta_lat = lat2 - lat1
     ad = 2 * asin(sqrt(sin(delta_lat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(delta_long / 2) ** 2))
-    dist = ad * rad
+    dist = ad * EARTH_RADIUS
     return dist
 
 
-def load_amenities_data(dir_path: str) -> List[Dict[str, float]]:
-    """Load amenities.
-    
+def load_amenities_snapshot(snapshot_path: str) -> Amenities:
+    """Load amenities from binary snapshot.
+
+    Arrays are memory-mapped, so processes loading the same snapshot share one copy of them.
+
+    Parameters
+    ----------
+     snapshot_path: directory with snapshot
+
+    Returns
+    -------
+     amenities: Amenities
+
+    """
+    with open(os.path.join(snapshot_path, SNAPSHOT_INDEX_FILE), encoding="utf-8") as f:
+        index = json.load(f)
+    if index["version"] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported amenity snapshot version: {index['version']}")
+    radians = np.load(os.path.join(snapshot_path, SNAPSHOT_RADIANS_FILE), mmap_mode="r")
+    xyz = np.load(os.path.join(snapshot_path, SNAPSHOT_XYZ_FILE), mmap_mode="r")
+    codes = np.repeat(np.arange(len(index["types"]), dtype=np.intp), index["counts"])
+    if radians.shape != (3, len(codes)) or xyz.shape != (len(codes), 3):
+        raise ValueError(f"Amenity snapshot {snapshot_path} does not match its index")
+    return Amenities(
+        types=tuple(index["types"]),
+        codes=codes,
+        lat=radians[0],
+        lon=radians[1],
+        cos_lat=radians[2],
+        tree=cKDTree(xyz, copy_data=False),
+    )
+
+
+def load_amenities_data(dir_path: str, snapshot_path: str = "", raster_path: str = "") -> Amenities:
+    """Load amenities from snapshot if it exists, otherwise from json files.
+
+    Parameters
+    ----------
+     dir_path: directory with json files
+     snapshot_path: directory with binary snapshot
+     raster_path: directory with raster of counts, empty string means exact counting
+
+    Returns
+    -------
+     amenities: Amenities
+
+    """
+    if snapshot_path and os.path.exists(os.path.join(snapshot_path, SNAPSHOT_INDEX_FILE)):
+        amenities = load_amenities_snapshot(snapshot_path)
+    else:
+        amenities = load_amenities_json(dir_path)
+    if not raster_path:
+        return amenities
+    raster = load_amenity_raster(raster_path)
+    columns = {f"{name}_{distance}" for name in amenities.types for distance in DISTANCES}
+    if set(raster.columns) != columns:
+        raise ValueError(f"Columns of amenity raster {raster_path} do not match amenities")
+    return replace(amenities, raster=raster)
+
+
+def load_amenities_json(dir_path: str) -> Amenities:
+    """Load amenities from json files.
+
     Parameters
     ----------
      dir_path: str
-    
+
     Returns
     -------
-     dict with amenities: List[Dict[str, float]]
-    
+     amenities: Amenities
+
     """
-    amenities = []
+    coordinates: Dict[str, List[Tuple[float, float]]] = dict()
     for root, _, files in os.walk(dir_path):
         for filename in files:
             filepath = os.path.join(root, filename)
             name, _ = os.path.splitext(filename)
             with open(filepath, 'r', encoding='utf-8') as f:
                 amenitiy_data = json.load(f)
+            points = coordinates.setdefault(name, [])
             for item in amenitiy_data:
-                amenitiy_item = dict(lon=item['lon'], lat=item['lat'], type=name)
-                amenities.append(amenitiy_item)
-    return amenities
\ No newline at end of file
+                points.append((float(item['lat']), float(item['lon'])))
+    return build_amenities(coordinates)
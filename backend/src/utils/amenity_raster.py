@@ -0,0 +1,82 @@
+"""Module for lookup of precomputed amenity counts."""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+# files of raster built by research/src/features/build_amenity_raster.py
+RASTER_FORMAT_VERSION = 1
+RASTER_INDEX_FILE = "index.json"
+RASTER_COUNTS_FILE = "counts.npy"
+
+
+@dataclass(frozen=True)
+class AmenityRaster:
+    """Amenity counts for centers of cells of a regular lat/lon grid.
+
+    Counts of a cell are exact for its center, so only amenities which are closer to a radius
+    than half of the cell diagonal can be counted differently for a point of the cell.
+    """
+
+    columns: Tuple[str, ...]
+    lat0: float
+    lon0: float
+    lat_step: float
+    lon_step: float
+    cell_size: float
+    counts: npt.NDArray[np.uint16]
+
+    def lookup(
+        self, lat: npt.NDArray[np.float64], lon: npt.NDArray[np.float64]
+    ) -> Tuple[npt.NDArray[np.bool_], Dict[str, npt.NDArray[np.int64]]]:
+        """Get counts of cells containing points.
+
+        Parameters
+        ----------
+         lat: latitudes of points
+         lon: longitudes of points
+
+        Returns
+        -------
+         mask of points inside the grid and counts for them: Tuple[npt.NDArray[np.bool_], Dict[str, npt.NDArray]]
+
+        """
+        rows = np.rint((np.asarray(lat, dtype=np.float64) - self.lat0) / self.lat_step)
+        cols = np.rint((np.asarray(lon, dtype=np.float64) - self.lon0) / self.lon_step)
+        inside = (rows >= 0) & (rows < self.counts.shape[0]) & (cols >= 0) & (cols < self.counts.shape[1])
+        values = self.counts[rows[inside].astype(np.intp), cols[inside].astype(np.intp)].astype(np.int64)
+        return inside, {name: values[:, index] for index, name in enumerate(self.columns)}
+
+
+def load_amenity_raster(raster_path: str) -> AmenityRaster:
+    """Load memory-mapped amenity raster.
+
+    Parameters
+    ----------
+     raster_path: directory with raster
+
+    Returns
+    -------
+     raster: AmenityRaster
+
+    """
+    with open(os.path.join(raster_path, RASTER_INDEX_FILE), encoding="utf-8") as f:
+        index = json.load(f)
+    if index["version"] != RASTER_FORMAT_VERSION:
+        raise ValueError(f"Unsupported amenity raster version: {index['version']}")
+    counts = np.load(os.path.join(raster_path, RASTER_COUNTS_FILE), mmap_mode="r")
+    if counts.ndim != 3 or counts.shape[2] != len(index["columns"]):
+        raise ValueError(f"Amenity raster {raster_path} does not match its index")
+    return AmenityRaster(
+        columns=tuple(index["columns"]),
+        lat0=index["lat0"],
+        lon0=index["lon0"],
+        lat_step=index["lat_step"],
+        lon_step=index["lon_step"],
+        cell_size=index["cell_size"],
+        counts=counts,
+    )
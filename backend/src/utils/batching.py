@@ -0,0 +1,158 @@
+"""Module for micro-batching of concurrent predictions."""
+
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Sequence, Set
+
+from prometheus_client import Gauge, Histogram
+
+from src.schemas.predict import BasePredictionIn
+
+PredictFunction = Callable[[Sequence[BasePredictionIn], Sequence[float], Sequence[float]], Awaitable[List[float]]]
+
+QUEUE_DEPTH = Gauge(
+    "prediction_batcher_queue_depth", "Count of predictions waiting in the batcher queue", multiprocess_mode="livesum"
+)
+BATCH_SIZE = Histogram(
+    "prediction_batcher_batch_size",
+    "Count of predictions in one model call of the batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+WAIT_TIME = Histogram(
+    "prediction_batcher_wait_seconds",
+    "Time from queueing of prediction to the start of its model call",
+    buckets=(0.0005, 0.001, 0.002, 0.003, 0.005, 0.0075, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+@dataclass
+class QueuedPrediction:
+    """Prediction waiting in the batcher queue."""
+
+    data: BasePredictionIn
+    lat: float
+    lon: float
+    future: "asyncio.Future[float]"
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class PredictionBatcher:
+    """Collect concurrent predictions and make them with one model call.
+
+    Predictions are collected until the window since the first of them expires or max_size is reached.
+    Collected batch is processed in a separate task, so next batch is collected in the meantime.
+    """
+
+    def __init__(self, predict: PredictFunction, window: float, max_size: int) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         predict: async function making predictions for batch
+         window: max time of collecting batch in seconds
+         max_size: max count of predictions in batch
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.predict_batch = predict
+        self.window = window
+        self.max_size = max_size
+        self.queue: "asyncio.Queue[QueuedPrediction]" = asyncio.Queue()
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.processing: Set["asyncio.Task[None]"] = set()
+
+    def start(self) -> None:
+        """Start processing of queue."""
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop processing of queue and cancel waiting predictions."""
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        for task in list(self.processing):
+            task.cancel()
+        while not self.queue.empty():
+            self.queue.get_nowait().future.cancel()
+        QUEUE_DEPTH.set(0)
+
+    async def predict(self, data: BasePredictionIn, lat: float, lon: float) -> float:
+        """Queue prediction and wait for its result.
+
+        Parameters
+        ----------
+         data: user data
+         lat: latitude
+         lon: longitude
+
+        Returns
+        -------
+         prediction result: float
+
+        """
+        future: "asyncio.Future[float]" = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(QueuedPrediction(data=data, lat=lat, lon=lon, future=future))
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return await future
+
+    async def run(self) -> None:
+        """Collect batches from queue and process them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            QUEUE_DEPTH.set(self.queue.qsize())
+            task = asyncio.create_task(self.process(batch))
+            self.processing.add(task)
+            task.add_done_callback(self.processing.discard)
+
+    async def process(self, batch: List[QueuedPrediction]) -> None:
+        """Make predictions for batch and set results of waiting requests.
+
+        Parameters
+        ----------
+         batch: List[QueuedPrediction]
+
+        Returns
+        -------
+         nothing
+
+        """
+        started_at = time.perf_counter()
+        for item in batch:
+            WAIT_TIME.observe(started_at - item.queued_at)
+        BATCH_SIZE.observe(len(batch))
+        try:
+            values = await self.predict_batch(
+                [item.data for item in batch], [item.lat for item in batch], [item.lon for item in batch]
+            )
+        except asyncio.CancelledError:
+            for item in batch:
+                item.future.cancel()
+            raise
+        except Exception as ex:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(ex)
+            return
+        for item, value in zip(batch, values):
+            if not item.future.done():
+                item.future.set_result(value)
@@ -0,0 +1,146 @@
+"""Module for running CPU-bound predictions outside of the event loop."""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.schemas.predict import BasePredictionIn
+from src.utils.amenity import Amenities
+from src.utils.prediction import predict_apartments
+from src.utils.stages import collect_stages, observe_stages
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+worker_model: Any = None
+worker_amenities: Optional[Amenities] = None
+
+
+def init_worker(model_loader: Callable[[], Any], amenities_loader: Callable[[], Amenities]) -> None:
+    """Load model and amenities in process of pool.
+
+    Parameters
+    ----------
+     model_loader: picklable function returning model
+     amenities_loader: picklable function returning amenities
+
+    Returns
+    -------
+     nothing
+
+    """
+    global worker_model, worker_amenities
+    worker_model = model_loader()
+    worker_amenities = amenities_loader()
+
+
+def predict_in_worker(
+    data: Sequence[BasePredictionIn], lats: Sequence[float], lons: Sequence[float]
+) -> Tuple[List[float], Dict[str, float]]:
+    """Make predictions with model and amenities of process.
+
+    Parameters
+    ----------
+     data: user data for every apartment
+     lats: latitudes
+     lons: longitudes
+
+    Returns
+    -------
+     prediction results and durations of stages: Tuple[List[float], Dict[str, float]]
+
+    """
+    if worker_amenities is None:
+        raise RuntimeError("Worker is not initialized")
+    with collect_stages() as durations:
+        values = predict_apartments(worker_model, worker_amenities, data, lats, lons)
+    return values, durations
+
+
+class PredictionExecutor:
+    """Run predictions inline, in thread pool or in process pool with model loaded in every process."""
+
+    def __init__(
+        self, kind: str, workers: int, model_loader: Callable[[], Any], amenities_loader: Callable[[], Amenities]
+    ) -> None:
+        """Create pool.
+
+        Parameters
+        ----------
+         kind: one of EXECUTOR_KINDS
+         workers: count of threads or processes
+         model_loader: picklable function returning model, used by process pool
+         amenities_loader: picklable function returning amenities, used by process pool
+
+        Returns
+        -------
+         nothing
+
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.pool: Optional[Executor] = None
+        if kind == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prediction")
+        elif kind == "process":
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(model_loader, amenities_loader),
+            )
+
+    async def predict(
+        self,
+        model: Any,
+        amenities: Amenities,
+        data: Sequence[BasePredictionIn],
+        lats: Sequence[float],
+        lons: Sequence[float],
+        kind: str = "primary",
+    ) -> List[float]:
+        """Make predictions in pool.
+
+        Process pool uses its own model and amenities, so model and amenities are used only by other kinds.
+
+        Parameters
+        ----------
+         model: loaded model
+         amenities: Amenities
+         data: user data for every apartment
+         lats: latitudes
+         lons: longitudes
+         kind: kind of prediction in stage metrics
+
+        Returns
+        -------
+         prediction results: List[float]
+
+        """
+        if self.pool is None:
+            return predict_apartments(model, amenities, data, lats, lons, kind)
+        loop = asyncio.get_running_loop()
+        if self.kind == "process":
+            values, durations = await loop.run_in_executor(
+                self.pool, predict_in_worker, list(data), list(lats), list(lons)
+            )
+            observe_stages(durations, kind)
+            return values
+        return await loop.run_in_executor(self.pool, predict_apartments, model, amenities, data, lats, lons, kind)
+
+    def shutdown(self, drain: bool = False) -> None:
+        """Stop pool.
+
+        Parameters
+        ----------
+         drain: finish queued predictions instead of cancelling them
+
+        Returns
+        -------
+         nothing
+
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=not drain)
@@ -1,7 +1,10 @@
 """Module for preparing features."""
 
-from typing import Dict
+import threading
+from typing import Any, Dict, Mapping, Sequence
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
 from src.schemas.predict import BasePredictionIn
@@ -32,6 +35,25 @@ COLUMNS = [
     "health_1500",
     "health_3000",
 ]
+DISTANCE_COLUMNS = COLUMNS[COLUMNS.index("eat_500"):]
+# dtypes which pandas infers for values of BasePredictionIn, distances are cast with astype(int)
+COLUMN_DTYPES: Dict[str, npt.DTypeLike] = {
+    "number of floors": np.int64,
+    "type of house": object,
+    "number of rooms": np.int64,
+    "area of apartment": np.int64,
+    "apartment floor": np.int64,
+    "repair": object,
+    "terrace": object,
+    "extra": np.bool_,
+    "elevator": np.int64,
+    "bathroom": object,
+    "lat": np.float64,
+    "lon": np.float64,
+    **{name: np.dtype(int) for name in DISTANCE_COLUMNS},
+}
+
+thread_buffers = threading.local()
 
 
 def make_features_dataframe(
@@ -45,27 +67,104 @@ def make_features_dataframe(
     :param distance_data: dict with distances
     :return: feature dataframe
     """
-    prediction_data = {
-        "lat": lat,
-        "lon": lon,
-        "number of floors": apartment_data.number_of_floors,
-        "type of house": apartment_data.type_of_house.value,
-        "number of rooms": apartment_data.number_of_rooms,
-        "area of apartment": apartment_data.area_of_apartment,
-        "apartment floor": apartment_data.apartment_floor,
-        "repair": apartment_data.repair.value,
-        "terrace": apartment_data.terrace.value,
-        "extra": apartment_data.extra,
-        "elevator": apartment_data.elevator,
-        "bathroom": apartment_data.bathroom.value,
-    }
-    prediction_data = dict(**prediction_data, **distance_data)
-
-    df = pd.DataFrame(data=[prediction_data], columns=COLUMNS)
-
-    for col in ["eat_500", "eat_1500", "eat_3000", "culture_500", "culture_1500", 
-                "culture_3000", "edu_500", "edu_1500", "edu_3000", "health_500", 
-                "health_1500", "health_3000"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
-
-    return df
\ No newline at end of file
+    return make_features_dataframe_batch(
+        [apartment_data], [lat], [lon], {key: [value] for key, value in distance_data.items()}
+    )
+
+
+def make_features_dataframe_batch(
+    apartments_data: Sequence[BasePredictionIn],
+    lat: npt.ArrayLike,
+    lon: npt.ArrayLike,
+    distance_data: Mapping[str, npt.ArrayLike],
+) -> pd.DataFrame:
+    """Compose features for many apartments.
+
+    :param apartments_data: user data for every apartment
+    :param lat: latitudes
+    :param lon: longitudes
+    :param distance_data: dict with distances for every apartment
+    :return: feature dataframe with row for every apartment
+    """
+    return features_to_dataframe(get_feature_buffer().fill(apartments_data, lat, lon, distance_data))
+
+
+def features_to_dataframe(features: Mapping[str, npt.NDArray[Any]]) -> pd.DataFrame:
+    """Build dataframe from feature columns.
+
+    Columns are copied, so the dataframe doesn't share memory with the buffer.
+
+    :param features: feature columns in the order of COLUMNS
+    :return: feature dataframe
+    """
+    return pd.DataFrame(data=features)
+
+
+class FeatureBuffer:
+    """Preallocated feature columns in the order of COLUMNS reused between predictions."""
+
+    def __init__(self, capacity: int = 1) -> None:
+        """Allocate columns.
+
+        :param capacity: count of rows
+        """
+        self.capacity = 0
+        self.columns: Dict[str, npt.NDArray[Any]] = dict()
+        self.reserve(capacity)
+
+    def reserve(self, capacity: int) -> None:
+        """Grow columns to fit capacity rows.
+
+        :param capacity: count of rows
+        """
+        if capacity <= self.capacity:
+            return
+        self.capacity = max(capacity, 2 * self.capacity)
+        self.columns = {name: np.empty(self.capacity, dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+
+    def fill(
+        self,
+        apartments_data: Sequence[BasePredictionIn],
+        lat: npt.ArrayLike,
+        lon: npt.ArrayLike,
+        distance_data: Mapping[str, npt.ArrayLike],
+    ) -> Dict[str, npt.NDArray[Any]]:
+        """Write features to columns.
+
+        Returned columns are views of the buffer and valid until the next fill in the same thread.
+
+        :param apartments_data: user data for every apartment
+        :param lat: latitudes
+        :param lon: longitudes
+        :param distance_data: dict with distances for every apartment
+        :return: feature columns
+        """
+        size = len(apartments_data)
+        self.reserve(size)
+        features = {name: column[:size] for name, column in self.columns.items()}
+        features["number of floors"][:] = [item.number_of_floors for item in apartments_data]
+        features["type of house"][:] = [item.type_of_house.value for item in apartments_data]
+        features["number of rooms"][:] = [item.number_of_rooms for item in apartments_data]
+        features["area of apartment"][:] = [item.area_of_apartment for item in apartments_data]
+        features["apartment floor"][:] = [item.apartment_floor for item in apartments_data]
+        features["repair"][:] = [item.repair.value for item in apartments_data]
+        features["terrace"][:] = [item.terrace.value for item in apartments_data]
+        features["extra"][:] = [item.extra for item in apartments_data]
+        features["elevator"][:] = [item.elevator for item in apartments_data]
+        features["bathroom"][:] = [item.bathroom.value for item in apartments_data]
+        features["lat"][:] = lat
+        features["lon"][:] = lon
+        for name in DISTANCE_COLUMNS:
+            features[name][:] = distance_data.get(name, 0)
+        return features
+
+
+def get_feature_buffer() -> FeatureBuffer:
+    """Get feature buffer of current thread.
+
+    :return: feature buffer
+    """
+    buffer: FeatureBuffer | None = getattr(thread_buffers, "buffer", None)
+    if buffer is None:
+        buffer = thread_buffers.buffer = FeatureBuffer()
+    return buffer
@@ -1,7 +1,8 @@
 """Module for interaction with Geoapify."""
 
+import asyncio
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import aiohttp
 
@@ -39,6 +40,63 @@ class Coordinates:
     lat: float
 
 
+class GeoapifyClient:
+    """Long-lived HTTP session with bounded connection pool and count of concurrent requests."""
+
+    def __init__(
+        self, pool_size: int, concurrency: int, timeout: float, dns_cache_ttl: int, keepalive_timeout: float
+    ) -> None:
+        """Create session, must be called in running event loop.
+
+        Parameters
+        ----------
+         pool_size: max count of open connections
+         concurrency: max count of concurrent requests, others wait for their turn
+         timeout: seconds for whole request including waiting for connection
+         dns_cache_ttl: seconds to cache resolved hosts
+         keepalive_timeout: seconds to keep idle connection open
+
+        Returns
+        -------
+         nothing
+
+        """
+        connector = aiohttp.TCPConnector(
+            limit=pool_size, ttl_dns_cache=dns_cache_ttl, keepalive_timeout=keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def get_json(self, url: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """Send GET request and read json response.
+
+        Parameters
+        ----------
+         url: str
+         params: Dict[str, str]
+
+        Returns
+        -------
+         data: Dict[str, Any]
+
+        """
+        async with self.semaphore, self.session.get(url=url, params=params) as response:
+            if response.status != 200:
+                raise IncorrectQueryException()
+            data: Dict[str, Any] = await response.json(encoding='UTF-8')
+            return data
+
+    async def close(self) -> None:
+        """Close session.
+
+        Returns
+        -------
+         nothing
+
+        """
+        await self.session.close()
+
+
 def build_params(address: str, token: str) -> Dict[str, str]:
     """Build query params.
     
@@ -63,13 +121,14 @@ def build_params(address: str, token: str) -> Dict[str, str]:
     }
     
 
-async def send_request(url: str, params: Dict[str, str]) -> Dict[str, Any]:
+async def send_request(url: str, params: Dict[str, str], client: Optional[GeoapifyClient] = None) -> Dict[str, Any]:
     """Get nearest by address points.
     
     Parameters
     ----------
      url: str
      params: Dict[str, str]
+     client: shared client, if it is None, session is opened for this request
     
     Returns
     -------
@@ -77,23 +136,28 @@ async def send_request(url: str, params: Dict[str, str]) -> Dict[str, Any]:
     
     """
     try:
+        if client is not None:
+            return await client.get_json(url, params)
         async with aiohttp.ClientSession() as session:
             response = await session.get(url=url, params=params)
             if response.status != 200:
                 raise IncorrectQueryException()
             data: Dict[str, Any] = await response.json(encoding='UTF-8')
             return data
-    except aiohttp.ClientError:
+    except (aiohttp.ClientError, asyncio.TimeoutError):
         raise FetchException() from aiohttp.ClientError
     
     
-async def get_coordinates_by_address(address: str, token: str) -> Coordinates:
+async def get_coordinates_by_address(
+    address: str, token: str, client: Optional[GeoapifyClient] = None
+) -> Coordinates:
     """Get coordinates by address.
     
     Parameters
     ----------
      address: str
      token: str
+     client: shared client, if it is None, session is opened for this request
     
     Returns
     -------
@@ -101,7 +165,7 @@ async def get_coordinates_by_address(address: str, token: str) -> Coordinates:
      
     """
     params = build_params(address, token)
-    response_data = await send_request(URL, params)
+    response_data = await send_request(URL, params, client)
     for item in response_data['results']:
         if item['rank']['match_type'] == 'full_match':
             return Coordinates(lat=item['lat'], lon=item['lon'])
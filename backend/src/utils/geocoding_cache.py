@@ -0,0 +1,305 @@
+"""Module for caching of geocoding results."""
+
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from prometheus_client import Counter
+
+from src.utils.geoapify import Coordinates, GeoapifyClient, NoResultsException, get_coordinates_by_address
+from src.utils.single_flight import SingleFlight
+from src.utils.stages import measure_stage
+
+CACHE_HITS = Counter(
+    "geocoding_cache_hits", "Count of addresses found in the geocoding cache", ["result", "backend"]
+)
+CACHE_MISSES = Counter("geocoding_cache_misses", "Count of addresses sent to Geoapify")
+
+# expiration time and coordinates, None means that Geoapify has not found the address
+CacheItem = Tuple[float, Optional[Coordinates]]
+
+geocoding_flights: SingleFlight[Coordinates] = SingleFlight("geocoding")
+
+T = TypeVar("T")
+
+
+def normalize_address(address: str) -> str:
+    """Normalize address to use it as cache key, the same as in the geocoding store of research.
+
+    Parameters
+    ----------
+     address: str
+
+    Returns
+    -------
+     normalized address: str
+
+    """
+    return " ".join(address.casefold().split())
+
+
+class GeocodingCache:
+    """LRU cache of geocoding results with TTL and optional persistent SQLite storage.
+
+    Addresses which Geoapify has not found are cached with a shorter TTL. SQLite storage survives restarts
+    and can be shared between workers, recently used items are also kept in memory. The add_coordinates stage
+    of research writes the same table, so addresses geocoded by the pipeline are served without requests.
+    Queries to SQLite run in a dedicated thread, so reads and committed writes don't block the event loop.
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float, sqlite_path: str = "") -> None:
+        """Set values and open storage.
+
+        Parameters
+        ----------
+         max_size: max count of items in memory
+         ttl: seconds to keep found coordinates
+         negative_ttl: seconds to keep addresses which are not found
+         sqlite_path: path of SQLite database, empty string means in-memory cache only
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.items: "OrderedDict[str, CacheItem]" = OrderedDict()
+        self.connection: Optional[sqlite3.Connection] = None
+        self.storage_executor: Optional[ThreadPoolExecutor] = None
+        if sqlite_path:
+            self.storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocoding-cache")
+            self.connection = sqlite3.connect(sqlite_path, isolation_level=None, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocoding "
+                "(address TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+            )
+            self.connection.execute("DELETE FROM geocoding WHERE expires_at <= ?", (time.time(),))
+
+    async def get(self, address: str) -> Optional[Coordinates]:
+        """Get cached coordinates of address.
+
+        Parameters
+        ----------
+         address: str
+
+        Returns
+        -------
+         coordinates or None if address is not cached: Optional[Coordinates]
+
+        Raises
+        ------
+         NoResultsException if it is cached that address is not found
+
+        """
+        key = normalize_address(address)
+        backend = "memory"
+        item = self.get_from_memory(key)
+        if item is None and self.connection is not None:
+            backend = "sqlite"
+            item = await self.run_in_storage(self.get_from_storage, key)
+            if item is not None:
+                self.put_to_memory(key, item)
+        if item is None:
+            CACHE_MISSES.inc()
+            return None
+        _, coords = item
+        CACHE_HITS.labels(result="negative" if coords is None else "positive", backend=backend).inc()
+        if coords is None:
+            raise NoResultsException()
+        return coords
+
+    async def put(self, address: str, coords: Optional[Coordinates]) -> None:
+        """Cache coordinates of address.
+
+        Parameters
+        ----------
+         address: str
+         coords: coordinates or None if address is not found
+
+        Returns
+        -------
+         nothing
+
+        """
+        key = normalize_address(address)
+        item = (time.time() + (self.negative_ttl if coords is None else self.ttl), coords)
+        self.put_to_memory(key, item)
+        if self.connection is not None:
+            await self.run_in_storage(self.put_to_storage, key, item)
+
+    async def run_in_storage(self, func: Callable[..., T], *args: Any) -> T:
+        """Run query to SQLite in the storage thread.
+
+        Parameters
+        ----------
+         func: function querying SQLite
+         args: arguments of function
+
+        Returns
+        -------
+         result of function: T
+
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.storage_executor, func, *args)
+
+    def get_from_memory(self, key: str) -> Optional[CacheItem]:
+        """Get not expired item from memory.
+
+        Parameters
+        ----------
+         key: normalized address
+
+        Returns
+        -------
+         item: Optional[CacheItem]
+
+        """
+        item = self.items.get(key)
+        if item is None:
+            return None
+        if item[0] <= time.time():
+            del self.items[key]
+            return None
+        self.items.move_to_end(key)
+        return item
+
+    def put_to_memory(self, key: str, item: CacheItem) -> None:
+        """Put item to memory evicting least recently used items.
+
+        Parameters
+        ----------
+         key: normalized address
+         item: CacheItem
+
+        Returns
+        -------
+         nothing
+
+        """
+        if self.max_size <= 0:
+            return
+        self.items[key] = item
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def get_from_storage(self, key: str) -> Optional[CacheItem]:
+        """Get not expired item from SQLite.
+
+        Parameters
+        ----------
+         key: normalized address
+
+        Returns
+        -------
+         item: Optional[CacheItem]
+
+        """
+        if self.connection is None:
+            return None
+        row = self.connection.execute(
+            "SELECT lat, lon, expires_at FROM geocoding WHERE address = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        lat, lon, expires_at = row
+        return expires_at, None if lat is None else Coordinates(lat=lat, lon=lon)
+
+    def put_to_storage(self, key: str, item: CacheItem) -> None:
+        """Write item to SQLite.
+
+        Parameters
+        ----------
+         key: normalized address
+         item: CacheItem
+
+        Returns
+        -------
+         nothing
+
+        """
+        if self.connection is None:
+            return
+        expires_at, coords = item
+        self.connection.execute(
+            "INSERT OR REPLACE INTO geocoding (address, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+            (key, coords.lat if coords else None, coords.lon if coords else None, expires_at),
+        )
+
+    def close(self) -> None:
+        """Wait for queries in progress and close storage.
+
+        Returns
+        -------
+         nothing
+
+        """
+        if self.storage_executor is not None:
+            self.storage_executor.shutdown()
+            self.storage_executor = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+async def get_cached_coordinates(
+    address: str, token: str, cache: Optional[GeocodingCache], client: Optional[GeoapifyClient] = None
+) -> Coordinates:
+    """Get coordinates by address from cache or from Geoapify.
+
+    Concurrent lookups of the same normalized address share one request to Geoapify.
+
+    Parameters
+    ----------
+     address: str
+     token: str
+     cache: cache or None if caching is disabled
+     client: shared Geoapify client
+
+    Returns
+    -------
+     coordinates: Coordinates
+
+    """
+    if cache is not None:
+        coords = await cache.get(address)
+        if coords is not None:
+            return coords
+    return await geocoding_flights.run(
+        normalize_address(address), lambda: fetch_coordinates(address, token, cache, client)
+    )
+
+
+async def fetch_coordinates(
+    address: str, token: str, cache: Optional[GeocodingCache], client: Optional[GeoapifyClient]
+) -> Coordinates:
+    """Get coordinates by address from Geoapify and put them to cache.
+
+    Parameters
+    ----------
+     address: str
+     token: str
+     cache: cache or None if caching is disabled
+     client: shared Geoapify client
+
+    Returns
+    -------
+     coordinates: Coordinates
+
+    """
+    try:
+        with measure_stage("geocoding_request"):
+            coords = await get_coordinates_by_address(address, token, client)
+    except NoResultsException:
+        if cache is not None:
+            await cache.put(address, None)
+        raise
+    if cache is not None:
+        await cache.put(address, coords)
+    return coords
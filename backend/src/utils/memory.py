@@ -0,0 +1,106 @@
+"""Module for reporting memory of the process."""
+
+import asyncio
+import os
+import resource
+from functools import partial
+from typing import Dict
+
+from prometheus_client import Gauge
+
+# fields of /proc/<pid>/smaps_rollup in kB
+SMAPS_FIELDS = {
+    "rss": ("Rss",),
+    "pss": ("Pss",),
+    "shared": ("Shared_Clean", "Shared_Dirty"),
+    "private": ("Private_Clean", "Private_Dirty"),
+}
+
+# metrics of gunicorn workers are merged from files, where values of functions are not stored
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+MEMORY_REFRESH_INTERVAL = 15.0
+
+MEMORY_USAGE = Gauge(
+    "process_memory_usage_bytes",
+    "Memory of the worker: rss, pss (shared pages divided between processes), shared and private",
+    ["kind"],
+    multiprocess_mode="liveall",
+)
+
+
+def get_memory_usage(pid: int = 0) -> Dict[str, int]:
+    """Get memory of the process in bytes.
+
+    Shared pages are the ones which also are mapped by other processes, e.g. objects loaded before fork
+    and memory-mapped files. Without /proc only max rss of the current process is known.
+
+    Parameters
+    ----------
+     pid: id of process, 0 means the current one
+
+    Returns
+    -------
+     rss, pss, shared and private bytes: Dict[str, int]
+
+    """
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    if not os.path.exists(path):
+        return {"rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    values: Dict[str, int] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                values[name] = int(value.split()[0]) * 1024
+    return {kind: sum(values.get(field, 0) for field in fields) for kind, fields in SMAPS_FIELDS.items()}
+
+
+def get_memory_usage_of_kind(kind: str) -> float:
+    """Read one kind of memory usage of the current process.
+
+    Parameters
+    ----------
+     kind: rss, pss, shared or private
+
+    Returns
+    -------
+     bytes: float
+
+    """
+    return get_memory_usage().get(kind, 0)
+
+
+def track_memory_usage() -> Dict[str, int]:
+    """Export memory of the current process to metrics, values are read on every scrape.
+
+    With metrics of several processes current values are written instead and updated by refresh_memory_usage.
+
+    Returns
+    -------
+     current rss, pss, shared and private bytes: Dict[str, int]
+
+    """
+    usage = get_memory_usage()
+    for kind, value in usage.items():
+        if MULTIPROCESS:
+            MEMORY_USAGE.labels(kind).set(value)
+        else:
+            MEMORY_USAGE.labels(kind).set_function(partial(get_memory_usage_of_kind, kind))
+    return usage
+
+
+async def refresh_memory_usage(interval: float = MEMORY_REFRESH_INTERVAL) -> None:
+    """Write memory of the current process to metrics until cancelled.
+
+    Parameters
+    ----------
+     interval: seconds between updates
+
+    Returns
+    -------
+     nothing
+
+    """
+    while True:
+        await asyncio.sleep(interval)
+        track_memory_usage()
@@ -0,0 +1,273 @@
+"""Module for local cache of model artifacts."""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+OBJECTS_DIR = "objects"
+
+
+@dataclass
+class CacheEntry:
+    """Cached version of registered model."""
+
+    name: str
+    version: str
+    digest: str
+    last_used: float
+
+
+class ModelCache:
+    """Content-addressed cache of model artifacts.
+
+    Artifacts are stored in objects/<sha256 of content>, index.json maps model name and version to the digest.
+    Registered versions are immutable, so entries are not revalidated against the registry. Least recently used
+    versions are evicted when there are more than max_versions of them.
+    """
+
+    def __init__(self, cache_dir: str, max_versions: int) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         cache_dir: str
+         max_versions: max count of cached model versions
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.cache_dir = cache_dir
+        self.max_versions = max_versions
+        os.makedirs(os.path.join(cache_dir, OBJECTS_DIR), exist_ok=True)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Lock cache for other processes.
+
+        Returns
+        -------
+         nothing
+
+        """
+        with open(os.path.join(self.cache_dir, LOCK_FILE), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, name: str, version: str) -> Optional[str]:
+        """Get path of cached model version.
+
+        Entries with corrupted artifacts are removed.
+
+        Parameters
+        ----------
+         name: model name
+         version: model version
+
+        Returns
+        -------
+         local path or None if version is not cached: Optional[str]
+
+        """
+        with self.lock():
+            entries = self.read_index()
+            entry = entries.get(get_key(name, version))
+            if entry is None:
+                return None
+            path = self.object_path(entry.digest)
+            if not os.path.isdir(path) or calculate_digest(path) != entry.digest:
+                del entries[get_key(name, version)]
+                self.remove_unused_objects(entries)
+                self.write_index(entries)
+                return None
+            entry.last_used = time.time()
+            self.write_index(entries)
+            return path
+
+    def get_latest(self, name: str) -> Optional[Tuple[str, str]]:
+        """Get the most recently used cached version of model.
+
+        Parameters
+        ----------
+         name: model name
+
+        Returns
+        -------
+         version and local path or None if model is not cached: Optional[Tuple[str, str]]
+
+        """
+        with self.lock():
+            entries = [entry for entry in self.read_index().values() if entry.name == name]
+        for entry in sorted(entries, key=lambda item: item.last_used, reverse=True):
+            path = self.get(entry.name, entry.version)
+            if path is not None:
+                return entry.version, path
+        return None
+
+    def put(self, name: str, version: str, source_dir: str) -> str:
+        """Copy model artifacts to cache.
+
+        Parameters
+        ----------
+         name: model name
+         version: model version
+         source_dir: directory with downloaded artifacts
+
+        Returns
+        -------
+         local path: str
+
+        """
+        digest = calculate_digest(source_dir)
+        path = self.object_path(digest)
+        with self.lock():
+            if not os.path.isdir(path):
+                tmp_path = tempfile.mkdtemp(dir=os.path.join(self.cache_dir, OBJECTS_DIR))
+                shutil.copytree(source_dir, tmp_path, dirs_exist_ok=True)
+                os.replace(tmp_path, path)
+            entries = self.read_index()
+            entry = CacheEntry(name=name, version=version, digest=digest, last_used=time.time())
+            entries[get_key(name, version)] = entry
+            self.evict(entries)
+            self.write_index(entries)
+        return path
+
+    def evict(self, entries: Dict[str, CacheEntry]) -> None:
+        """Remove least recently used entries exceeding max_versions.
+
+        Parameters
+        ----------
+         entries: Dict[str, CacheEntry]
+
+        Returns
+        -------
+         nothing
+
+        """
+        by_usage: List[CacheEntry] = sorted(entries.values(), key=lambda item: item.last_used, reverse=True)
+        for entry in by_usage[self.max_versions:]:
+            del entries[get_key(entry.name, entry.version)]
+        self.remove_unused_objects(entries)
+
+    def remove_unused_objects(self, entries: Dict[str, CacheEntry]) -> None:
+        """Remove artifacts which are not referenced by entries.
+
+        Parameters
+        ----------
+         entries: Dict[str, CacheEntry]
+
+        Returns
+        -------
+         nothing
+
+        """
+        used = {entry.digest for entry in entries.values()}
+        objects_dir = os.path.join(self.cache_dir, OBJECTS_DIR)
+        for digest in os.listdir(objects_dir):
+            if digest not in used:
+                shutil.rmtree(os.path.join(objects_dir, digest), ignore_errors=True)
+
+    def object_path(self, digest: str) -> str:
+        """Get path of artifacts with digest.
+
+        Parameters
+        ----------
+         digest: str
+
+        Returns
+        -------
+         path: str
+
+        """
+        return os.path.join(self.cache_dir, OBJECTS_DIR, digest)
+
+    def read_index(self) -> Dict[str, CacheEntry]:
+        """Read index of cache.
+
+        Returns
+        -------
+         entries by key: Dict[str, CacheEntry]
+
+        """
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+        # run_id written by previous versions of the cache is ignored
+        entries = [
+            CacheEntry(name=item["name"], version=item["version"], digest=item["digest"], last_used=item["last_used"])
+            for item in data
+        ]
+        return {get_key(entry.name, entry.version): entry for entry in entries}
+
+    def write_index(self, entries: Dict[str, CacheEntry]) -> None:
+        """Write index of cache atomically.
+
+        Parameters
+        ----------
+         entries: Dict[str, CacheEntry]
+
+        Returns
+        -------
+         nothing
+
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump([asdict(entry) for entry in entries.values()], f)
+        os.replace(tmp_path, os.path.join(self.cache_dir, INDEX_FILE))
+
+
+def get_key(name: str, version: str) -> str:
+    """Get key of model version in index.
+
+    Parameters
+    ----------
+     name: model name
+     version: model version
+
+    Returns
+    -------
+     key: str
+
+    """
+    return f"{name}/{version}"
+
+
+def calculate_digest(dir_path: str) -> str:
+    """Calculate sha256 of directory content including relative paths of files.
+
+    Parameters
+    ----------
+     dir_path: str
+
+    Returns
+    -------
+     hex digest: str
+
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(dir_path):
+        dirs.sort()
+        for filename in sorted(files):
+            filepath = os.path.join(root, filename)
+            header = f"{os.path.relpath(filepath, dir_path)}\0{os.path.getsize(filepath)}\0"
+            digest.update(header.encode("utf-8"))
+            with open(filepath, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
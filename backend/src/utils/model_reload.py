@@ -0,0 +1,135 @@
+"""Module for reloading model without restart."""
+
+import asyncio
+import contextlib
+import time
+from typing import Any, Callable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.logger import logger
+from src.utils.executor import PredictionExecutor
+from src.utils.models import ModelRegistry
+from src.utils.prediction import make_synthetic_apartments, warm_up
+
+# gauge instead of Info, which is not supported when metrics of gunicorn workers are merged
+MODEL_INFO = Gauge("model_info", "Served model version, 1 for served one", ["version"], multiprocess_mode="livemax")
+MODEL_RELOADS = Counter("model_reloads", "Count of attempts to load new model version", ["result"])
+MODEL_RELOAD_TIME = Histogram(
+    "model_reload_seconds",
+    "Time of loading and warming up new model version",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+ExecutorFactory = Callable[[Callable[[], Any]], PredictionExecutor]
+
+
+def set_served_version(version: str, previous_version: Optional[str] = None) -> None:
+    """Mark version of model as served in metrics.
+
+    Parameters
+    ----------
+     version: served version
+     previous_version: version which is not served anymore
+
+    Returns
+    -------
+     nothing
+
+    """
+    if previous_version is not None and previous_version != version:
+        MODEL_INFO.labels(version=previous_version).set(0)
+    MODEL_INFO.labels(version=version).set(1)
+
+
+class ModelReloader:
+    """Poll registry and swap model of application when served version changes.
+
+    New version is loaded and warmed up in a thread, then references in the application state are replaced
+    in the event loop, so requests which have already taken the old model finish with it.
+    """
+
+    def __init__(
+        self,
+        state: Any,
+        registry: ModelRegistry,
+        interval: float,
+        warm_up_requests: int,
+        create_executor: ExecutorFactory,
+    ) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         state: application state with model, model_version, amenities_data and executor
+         registry: ModelRegistry
+         interval: seconds between polls
+         warm_up_requests: count of synthetic requests for new model
+         create_executor: function creating executor for model loader, used for process executor
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.state = state
+        self.registry = registry
+        self.interval = interval
+        self.warm_up_requests = warm_up_requests
+        self.create_executor = create_executor
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        """Start polling."""
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def run(self) -> None:
+        """Poll registry until stopped."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reload()
+            except Exception:
+                MODEL_RELOADS.labels(result="failure").inc()
+                logger.exception("Failed to reload model")
+
+    async def reload(self) -> bool:
+        """Load, warm up and swap model if served version has changed.
+
+        Returns
+        -------
+         whether model is swapped: bool
+
+        """
+        version = await asyncio.to_thread(self.registry.get_version)
+        if version == self.state.model_version:
+            return False
+        start = time.perf_counter()
+        loader = self.registry.get_loader(version)
+        model = await asyncio.to_thread(loader)
+        await asyncio.to_thread(warm_up, model, self.state.amenities_data, self.warm_up_requests)
+        executor: Optional[PredictionExecutor] = None
+        if self.state.executor.kind == "process":
+            executor = self.create_executor(loader)
+            data, lats, lons = make_synthetic_apartments(self.warm_up_requests)
+            await executor.predict(model, self.state.amenities_data, data, lats, lons, "warm_up")
+        previous_version = self.state.model_version
+        previous_executor = self.state.executor
+        self.state.model = model
+        self.state.model_version = version
+        if executor is not None:
+            self.state.executor = executor
+            await asyncio.to_thread(previous_executor.shutdown, True)
+        set_served_version(version, previous_version)
+        MODEL_RELOADS.labels(result="success").inc()
+        MODEL_RELOAD_TIME.observe(time.perf_counter() - start)
+        logger.info(f"Swapped model {previous_version} -> {version} in {time.perf_counter() - start:.1f} s")
+        return True
@@ -0,0 +1,194 @@
+"""Module for serving predictions with several models."""
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Set
+
+from prometheus_client import Counter, Histogram
+
+from src.logger import logger
+from src.schemas.predict import BasePredictionIn
+from src.utils.prediction import predict_apartments
+
+PRIMARY_MODEL = "primary"
+
+PREDICTION_TIME = Histogram(
+    "model_prediction_seconds",
+    "Time of single prediction by model",
+    ["model"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+SERVED_PREDICTIONS = Counter("model_served_predictions", "Count of single predictions returned to users", ["model"])
+SHADOW_DIFFERENCE = Histogram(
+    "shadow_prediction_relative_difference",
+    "Relative difference of shadow prediction from served prediction",
+    ["model"],
+    buckets=(-0.5, -0.2, -0.1, -0.05, -0.02, -0.01, 0, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5),
+)
+SHADOW_DROPPED = Counter("shadow_predictions_dropped", "Count of mirrored requests dropped because of backlog")
+
+
+class ModelRouter:
+    """Serve a share of requests with candidate model and mirror a share of requests to shadow models.
+
+    Candidate and shadow models run in their own thread pools, shadow predictions are made in background tasks
+    after response is ready and are dropped when too many of them are pending.
+    """
+
+    def __init__(
+        self,
+        state: Any,
+        models: Dict[str, Any],
+        candidate: str,
+        candidate_fraction: float,
+        shadows: List[str],
+        shadow_fraction: float,
+        workers: int,
+        max_pending: int,
+    ) -> None:
+        """Set values and create pools.
+
+        Parameters
+        ----------
+         state: application state with amenities_data
+         models: additional models by name
+         candidate: name of model serving a share of requests, empty string means no candidate
+         candidate_fraction: share of requests served by candidate
+         shadows: names of shadow models
+         shadow_fraction: share of requests mirrored to shadow models
+         workers: count of threads for candidate
+         max_pending: max count of pending mirrored requests
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.state = state
+        self.models = models
+        self.candidate = candidate
+        self.candidate_fraction = candidate_fraction
+        self.shadows = shadows
+        self.shadow_fraction = shadow_fraction
+        self.max_pending = max_pending
+        self.candidate_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="candidate")
+        self.shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self.pending: Set["asyncio.Task[None]"] = set()
+
+    def choose(self) -> str:
+        """Choose model serving request.
+
+        Returns
+        -------
+         name of model or PRIMARY_MODEL: str
+
+        """
+        if self.candidate and random.random() < self.candidate_fraction:
+            return self.candidate
+        return PRIMARY_MODEL
+
+    async def predict(self, name: str, data: BasePredictionIn, lat: float, lon: float) -> float:
+        """Make prediction with candidate model.
+
+        Parameters
+        ----------
+         name: name of model
+         data: user data
+         lat: latitude
+         lon: longitude
+
+        Returns
+        -------
+         prediction result: float
+
+        """
+        return await self.run(self.candidate_pool, "candidate", name, data, lat, lon)
+
+    async def run(
+        self, pool: ThreadPoolExecutor, kind: str, name: str, data: BasePredictionIn, lat: float, lon: float
+    ) -> float:
+        """Make prediction with model in pool.
+
+        Parameters
+        ----------
+         pool: ThreadPoolExecutor
+         kind: candidate or shadow, kind of prediction in stage metrics
+         name: name of model
+         data: user data
+         lat: latitude
+         lon: longitude
+
+        Returns
+        -------
+         prediction result: float
+
+        """
+        start = time.perf_counter()
+        values = await asyncio.get_running_loop().run_in_executor(
+            pool, predict_apartments, self.models[name], self.state.amenities_data, [data], [lat], [lon], kind
+        )
+        PREDICTION_TIME.labels(model=name).observe(time.perf_counter() - start)
+        return values[0]
+
+    def mirror(self, data: BasePredictionIn, lat: float, lon: float, value: float) -> None:
+        """Send request to shadow models in background.
+
+        Parameters
+        ----------
+         data: user data
+         lat: latitude
+         lon: longitude
+         value: served prediction
+
+        Returns
+        -------
+         nothing
+
+        """
+        if not self.shadows or random.random() >= self.shadow_fraction:
+            return
+        if len(self.pending) >= self.max_pending:
+            SHADOW_DROPPED.inc()
+            return
+        task = asyncio.create_task(self.compare(data, lat, lon, value))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def compare(self, data: BasePredictionIn, lat: float, lon: float, value: float) -> None:
+        """Make shadow predictions and observe their difference from served prediction.
+
+        Parameters
+        ----------
+         data: user data
+         lat: latitude
+         lon: longitude
+         value: served prediction
+
+        Returns
+        -------
+         nothing
+
+        """
+        for name in self.shadows:
+            try:
+                shadow_value = await self.run(self.shadow_pool, "shadow", name, data, lat, lon)
+            except Exception:
+                logger.exception(f"Shadow model {name} failed")
+                continue
+            if value:
+                SHADOW_DIFFERENCE.labels(model=name).observe((shadow_value - value) / value)
+
+    def close(self) -> None:
+        """Cancel pending shadow predictions and stop pools.
+
+        Returns
+        -------
+         nothing
+
+        """
+        for task in list(self.pending):
+            task.cancel()
+        self.candidate_pool.shutdown(wait=False, cancel_futures=True)
+        self.shadow_pool.shutdown(wait=False, cancel_futures=True)
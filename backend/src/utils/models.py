@@ -1,27 +1,342 @@
 """Models for loading model."""
 
+import json
 import os
+import tempfile
+from functools import partial
+from typing import Any, Callable, Mapping, Protocol
 
 import catboost
 import mlflow
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import requests
+from mlflow.exceptions import MlflowException
+from mlflow.models import Model
+from mlflow.tracking import MlflowClient
 
 from src.config import Config
+from src.logger import logger
+from src.utils.feature_preparing import COLUMNS
+from src.utils.model_cache import ModelCache
 
+# up to this count of rows object array is cheaper for catboost than dataframe
+NATIVE_ARRAY_MAX_ROWS = 128
+
+
+class NativeCatBoostModel:
+    """CatBoost model called directly without mlflow pyfunc wrapper."""
+
+    def __init__(self, model: catboost.CatBoost, thread_count: int = -1) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         model: catboost.CatBoost
+         thread_count: threads of catboost for batches, -1 means all cores
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.model = model
+        self.thread_count = thread_count
+        self.feature_names = list(model.feature_names_ or COLUMNS)
+
+    def predict(self, df: pd.DataFrame) -> npt.NDArray[np.float64]:
+        """Make predictions for dataframe, the same interface as pyfunc model.
+
+        Parameters
+        ----------
+         df: pd.DataFrame
+
+        Returns
+        -------
+         predictions: npt.NDArray[np.float64]
+
+        """
+        return self.predict_features({name: df[name].to_numpy() for name in self.feature_names})
+
+    def predict_features(self, features: Mapping[str, npt.NDArray[Any]]) -> npt.NDArray[np.float64]:
+        """Make predictions for feature columns without building dataframe when possible.
+
+        Single row is predicted as single object with one thread, small batches as object array.
+
+        Parameters
+        ----------
+         features: feature columns
+
+        Returns
+        -------
+         predictions: npt.NDArray[np.float64]
+
+        """
+        size = len(features[self.feature_names[0]])
+        if size == 1:
+            row = [features[name][0] for name in self.feature_names]
+            return np.array([self.model.predict(row, thread_count=1)])
+        if size <= NATIVE_ARRAY_MAX_ROWS:
+            data = np.empty((size, len(self.feature_names)), dtype=object)
+            for index, name in enumerate(self.feature_names):
+                data[:, index] = features[name]
+        else:
+            data = pd.DataFrame({name: features[name] for name in self.feature_names}, copy=False)
+        predictions: npt.NDArray[np.float64] = self.model.predict(data, thread_count=self.thread_count)
+        return predictions
+
+
+def get_cached_model_path(config: Config) -> str:
+    """Get local path of model version, download it to cache if it is not there.
+
+    Cached version is loaded without requests to the registry.
+
+    Parameters
+    ----------
+     config: Config
+
+    Returns
+    -------
+     local path: str
+
+    """
+    cache = ModelCache(config.MODEL_CACHE_DIR, config.MODEL_CACHE_MAX_VERSIONS)
+    path = cache.get(config.MODEL_NAME, config.MODEL_VERSION)
+    if path is not None:
+        logger.info(f"Loaded model {config.MODEL_NAME}/{config.MODEL_VERSION} from cache")
+        return path
+    mlflow.set_tracking_uri(config.MLFLOW_TRACKING_URI)
+    with tempfile.TemporaryDirectory(dir=config.MODEL_CACHE_DIR) as tmp_dir:
+        local_path = mlflow.artifacts.download_artifacts(
+            artifact_uri=f"models:/{config.MODEL_NAME}/{config.MODEL_VERSION}", dst_path=tmp_dir
+        )
+        path = cache.put(config.MODEL_NAME, config.MODEL_VERSION, local_path)
+    logger.info(f"Downloaded model {config.MODEL_NAME}/{config.MODEL_VERSION} to cache")
+    return path
+
+
+def load_model(config: Config) -> Any:
+    """Load model from MLflow Models Registry or from local CatBoost file.
 
-def load_model(config: Config) -> catboost.CatBoostRegressor:
-    """Load model from MLflow Models Registry.
-    
     Parameters
     ----------
      config: Config
-    
+
     Returns
     -------
-     catboost model
-     
+     mlflow pyfunc model or NativeCatBoostModel
+
     """
+    if config.MODEL_PATH:
+        model = catboost.CatBoostRegressor()
+        model.load_model(config.MODEL_PATH)
+        return NativeCatBoostModel(model, config.CATBOOST_THREAD_COUNT)
     mlflow.set_tracking_uri(config.MLFLOW_TRACKING_URI)
     os.environ["AWS_ACCESS_KEY_ID"] = config.AWS_ACCESS_KEY_ID
     os.environ["AWS_SECRET_ACCESS_KEY"] = config.AWS_SECRET_ACCESS_KEY
     os.environ["MLFLOW_S3_ENDPOINT_URL"] = config.MLFLOW_S3_ENDPOINT_URL
-    return mlflow.pyfunc.load_model(f"models:/{config.MODEL_NAME}/{config.MODEL_VERSION}")
\ No newline at end of file
+    model_uri = f"models:/{config.MODEL_NAME}/{config.MODEL_VERSION}"
+    if config.MODEL_CACHE_DIR:
+        model_uri = get_cached_model_path(config)
+    if config.MODEL_FLAVOR == "catboost":
+        flavors = Model.load(model_uri).flavors
+        if "catboost" not in flavors:
+            raise ValueError(
+                f"Model {config.MODEL_NAME}/{config.MODEL_VERSION} is not a CatBoost model, "
+                f"its flavors are {', '.join(flavors)}"
+            )
+        return NativeCatBoostModel(mlflow.catboost.load_model(model_uri), config.CATBOOST_THREAD_COUNT)
+    return mlflow.pyfunc.load_model(model_uri)
+
+
+def get_model_config(config: Config, spec: str) -> Config:
+    """Get config loading additional model.
+
+    Additional models get the same features as the primary CatBoost model. Other models of research are trained
+    on one-hot encoded features whose columns depend on the training data, so they are rejected by load_model.
+
+    Parameters
+    ----------
+     config: Config
+     spec: path of local CatBoost .cbm file or name and version of registered model, i.e. random-forest/3
+
+    Returns
+    -------
+     config of model: Config
+
+    """
+    if spec.endswith(".cbm"):
+        return config.model_copy(update={"MODEL_PATH": spec, "MODEL_VERSION": spec})
+    name, _, version = spec.rpartition("/")
+    if not name or not version:
+        raise ValueError(f"Model {spec} must be a .cbm file or name/version")
+    return config.model_copy(
+        update={"MODEL_NAME": name, "MODEL_VERSION": version, "MODEL_PATH": "", "MODEL_FLAVOR": "catboost"}
+    )
+
+
+class ModelRegistry(Protocol):
+    """Source of model versions."""
+
+    def get_version(self) -> str:
+        """Get version which should be served."""
+        ...
+
+    def get_loader(self, version: str) -> Callable[[], Any]:
+        """Get picklable function loading version."""
+        ...
+
+
+class MlflowModelRegistry:
+    """MLflow Models Registry, version is resolved by MODEL_ALIAS if it is set."""
+
+    def __init__(self, config: Config) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         config: Config
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.config = config
+
+    def get_version(self) -> str:
+        """Get version which should be served.
+
+        If the registry is unreachable and MODEL_CACHE_OFFLINE_FALLBACK is set, the most recently used cached
+        version is served instead, so it is reported as the served version and is replaced by the reloader
+        when the registry is back.
+
+        Returns
+        -------
+         version: str
+
+        """
+        if self.config.MODEL_PATH:
+            return self.config.MODEL_VERSION or self.config.MODEL_PATH
+        if not (self.config.MODEL_CACHE_DIR and self.config.MODEL_CACHE_OFFLINE_FALLBACK):
+            return self.get_registry_version()
+        cache = ModelCache(self.config.MODEL_CACHE_DIR, self.config.MODEL_CACHE_MAX_VERSIONS)
+        try:
+            version = self.get_registry_version()
+            if cache.get(self.config.MODEL_NAME, version) is None:
+                # version has to be downloaded, so the registry must be reachable
+                mlflow.set_tracking_uri(self.config.MLFLOW_TRACKING_URI)
+                MlflowClient().get_model_version(self.config.MODEL_NAME, version)
+            return version
+        except (MlflowException, OSError, requests.RequestException):
+            latest = cache.get_latest(self.config.MODEL_NAME)
+            if latest is None:
+                raise
+        version, _ = latest
+        logger.warning(f"Registry is unreachable, serving cached model {self.config.MODEL_NAME}/{version}")
+        return version
+
+    def get_registry_version(self) -> str:
+        """Get version which is configured or resolved by alias in the registry.
+
+        Returns
+        -------
+         version: str
+
+        """
+        if not self.config.MODEL_ALIAS:
+            return self.config.MODEL_VERSION
+        mlflow.set_tracking_uri(self.config.MLFLOW_TRACKING_URI)
+        model_version = MlflowClient().get_model_version_by_alias(self.config.MODEL_NAME, self.config.MODEL_ALIAS)
+        return str(model_version.version)
+
+    def get_loader(self, version: str) -> Callable[[], Any]:
+        """Get picklable function loading version.
+
+        Parameters
+        ----------
+         version: str
+
+        Returns
+        -------
+         loader: Callable[[], Any]
+
+        """
+        return partial(load_model, self.config.model_copy(update={"MODEL_VERSION": version}))
+
+
+class LocalModelRegistry:
+    """File-based stand-in of registry: json file with version and path of CatBoost model relative to it."""
+
+    def __init__(self, config: Config) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         config: Config
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.config = config
+        self.path = config.MODEL_REGISTRY_PATH
+
+    def read(self) -> Mapping[str, str]:
+        """Read registry file.
+
+        Returns
+        -------
+         version and path: Mapping[str, str]
+
+        """
+        with open(self.path, encoding="utf-8") as f:
+            data: Mapping[str, str] = json.load(f)
+        return data
+
+    def get_version(self) -> str:
+        """Get version which should be served.
+
+        Returns
+        -------
+         version: str
+
+        """
+        return str(self.read()["version"])
+
+    def get_loader(self, version: str) -> Callable[[], Any]:
+        """Get picklable function loading version.
+
+        Parameters
+        ----------
+         version: str
+
+        Returns
+        -------
+         loader: Callable[[], Any]
+
+        """
+        data = self.read()
+        if str(data["version"]) != version:
+            raise ValueError(f"Version {version} is not in registry {self.path}")
+        model_path = os.path.join(os.path.dirname(os.path.abspath(self.path)), data["path"])
+        return partial(load_model, self.config.model_copy(update={"MODEL_VERSION": version, "MODEL_PATH": model_path}))
+
+
+def get_model_registry(config: Config) -> ModelRegistry:
+    """Get registry of models for config.
+
+    Parameters
+    ----------
+     config: Config
+
+    Returns
+    -------
+     registry: ModelRegistry
+
+    """
+    if config.MODEL_REGISTRY_PATH:
+        return LocalModelRegistry(config)
+    return MlflowModelRegistry(config)
@@ -0,0 +1,107 @@
+"""Module for making predictions."""
+
+from itertools import cycle
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+from src.schemas.predict import BasePredictionIn, BathroomType, HouseType, RepairType, TerraceType
+from src.utils.amenity import Amenities, calculate_distances_batch
+from src.utils.feature_preparing import features_to_dataframe, get_feature_buffer
+from src.utils.stages import measure_stage
+
+
+def predict_apartments(
+    model: Any,
+    amenities: Amenities,
+    data: Sequence[BasePredictionIn],
+    lats: Sequence[float],
+    lons: Sequence[float],
+    kind: str = "primary",
+) -> List[float]:
+    """Prepare features and make prediction for many apartments with one model call.
+
+    Parameters
+    ----------
+     model: loaded model
+     amenities: Amenities
+     data: user data for every apartment
+     lats: latitudes
+     lons: longitudes
+     kind: kind of prediction in stage metrics
+
+    Returns
+    -------
+     prediction results: List[float]
+
+    """
+    if not data:
+        return []
+    with measure_stage("amenity_counts", kind):
+        distance_data = calculate_distances_batch(np.array(lats), np.array(lons), amenities)
+    predict_features = getattr(model, "predict_features", None)
+    with measure_stage("features", kind):
+        features = get_feature_buffer().fill(data, lats, lons, distance_data)
+        # mlflow pyfunc model enforces its schema on dataframe, so it is built only for it
+        dataframe = features_to_dataframe(features) if predict_features is None else None
+    with measure_stage("model", kind):
+        values = predict_features(features) if predict_features is not None else model.predict(dataframe)
+    return [float(value) for value in values]
+
+
+def make_synthetic_apartments(count: int) -> Tuple[List[BasePredictionIn], List[float], List[float]]:
+    """Make apartments covering all categories for warm-up requests.
+
+    Parameters
+    ----------
+     count: count of apartments
+
+    Returns
+    -------
+     user data, latitudes and longitudes: Tuple[List[BasePredictionIn], List[float], List[float]]
+
+    """
+    data = [
+        BasePredictionIn(
+            number_of_floors=5 + index % 20,
+            type_of_house=house,
+            number_of_rooms=1 + index % 4,
+            area_of_apartment=30 + 5 * (index % 20),
+            apartment_floor=1 + index % 5,
+            repair=repair,
+            terrace=terrace,
+            extra=index % 2 == 0,
+            elevator=index % 3,
+            bathroom=bathroom,
+        )
+        for index, house, repair, terrace, bathroom in zip(
+            range(count),
+            cycle(HouseType),
+            cycle(RepairType),
+            cycle(TerraceType),
+            cycle(BathroomType),
+        )
+    ]
+    lats = [55.75197 + 0.01 * (index % 7 - 3) for index in range(count)]
+    lons = [37.62354 + 0.01 * (index % 11 - 5) for index in range(count)]
+    return data, lats, lons
+
+
+def warm_up(model: Any, amenities: Amenities, count: int) -> None:
+    """Make single and batch predictions with synthetic apartments, so first requests are not slow.
+
+    Parameters
+    ----------
+     model: loaded model
+     amenities: Amenities
+     count: count of synthetic apartments
+
+    Returns
+    -------
+     nothing
+
+    """
+    data, lats, lons = make_synthetic_apartments(count)
+    for item, lat, lon in zip(data, lats, lons):
+        predict_apartments(model, amenities, [item], [lat], [lon], "warm_up")
+    predict_apartments(model, amenities, data, lats, lons, "warm_up")
@@ -0,0 +1,94 @@
+"""Module for caching of predictions."""
+
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from prometheus_client import Counter
+
+CACHE_HITS = Counter("prediction_cache_hits", "Count of predictions found in the prediction cache")
+CACHE_MISSES = Counter("prediction_cache_misses", "Count of predictions made by model with enabled cache")
+
+
+class PredictionCache:
+    """LRU cache of predictions of one model version.
+
+    The cache is cleared when version of model changes, predictions of previous version are not stored.
+    """
+
+    def __init__(self, max_size: int, coordinate_decimals: int) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         max_size: max count of predictions
+         coordinate_decimals: count of decimals of rounded latitude and longitude
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.max_size = max_size
+        self.coordinate_decimals = coordinate_decimals
+        self.version: Optional[str] = None
+        self.items: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def quantize(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Round coordinates, so close points share predictions.
+
+        Parameters
+        ----------
+         lat: latitude
+         lon: longitude
+
+        Returns
+        -------
+         rounded latitude and longitude: Tuple[float, float]
+
+        """
+        return round(lat, self.coordinate_decimals), round(lon, self.coordinate_decimals)
+
+    def get(self, version: str, key: Hashable) -> Optional[float]:
+        """Get cached prediction.
+
+        Parameters
+        ----------
+         version: version of current model
+         key: features of apartment
+
+        Returns
+        -------
+         prediction or None if it is not cached: Optional[float]
+
+        """
+        if version != self.version:
+            self.items.clear()
+            self.version = version
+        value = self.items.get(key)
+        if value is None:
+            CACHE_MISSES.inc()
+            return None
+        CACHE_HITS.inc()
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, version: str, key: Hashable, value: float) -> None:
+        """Cache prediction if it is made by current model version.
+
+        Parameters
+        ----------
+         version: version of model which made prediction
+         key: features of apartment
+         value: prediction
+
+        Returns
+        -------
+         nothing
+
+        """
+        if version != self.version:
+            return
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
@@ -0,0 +1,95 @@
+"""Module for loading read-only state shared by workers of the application."""
+
+import gc
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional
+
+from src.config import Config
+from src.logger import logger
+from src.utils.amenity import Amenities, load_amenities_data
+from src.utils.models import get_model_registry
+
+
+@dataclass(frozen=True)
+class SharedState:
+    """Model and amenities which are loaded once and only read by requests."""
+
+    model_version: str
+    model_loader: Callable[[], Any]
+    model: Any
+    amenities_loader: Callable[[], Amenities]
+    amenities_data: Amenities
+
+
+_preloaded: Optional[SharedState] = None
+
+
+def load_shared_state(config: Config) -> SharedState:
+    """Load current model version and amenities.
+
+    Parameters
+    ----------
+     config: Config
+
+    Returns
+    -------
+     state: SharedState
+
+    """
+    if config.AMENITY_COUNT_MODE == "raster" and not config.AMENITY_RASTER_PATH:
+        raise ValueError("AMENITY_RASTER_PATH is required for raster mode")
+    registry = get_model_registry(config)
+    model_version = registry.get_version()
+    model_loader = registry.get_loader(model_version)
+    model = model_loader()
+    logger.info(f"Loaded model {model_version}")
+    amenities_loader = partial(
+        load_amenities_data,
+        config.AMENITY_DIR_PATH,
+        config.AMENITY_SNAPSHOT_PATH,
+        config.AMENITY_RASTER_PATH if config.AMENITY_COUNT_MODE == "raster" else "",
+    )
+    amenities_data = amenities_loader()
+    logger.info(f"Loaded {len(amenities_data)} amenities, {config.AMENITY_COUNT_MODE} counting")
+    return SharedState(model_version, model_loader, model, amenities_loader, amenities_data)
+
+
+def preload_shared_state(config: Config) -> SharedState:
+    """Load state in the master process before workers are forked.
+
+    Objects which exist before fork are shared by workers copy-on-write. They are moved to the permanent
+    generation of the garbage collector, otherwise collections in workers touch their headers and copy pages.
+    No predictions are made here, thread pools of the model must not be started before fork.
+
+    Parameters
+    ----------
+     config: Config
+
+    Returns
+    -------
+     state: SharedState
+
+    """
+    global _preloaded
+    _preloaded = load_shared_state(config)
+    gc.collect()
+    gc.freeze()
+    return _preloaded
+
+
+def get_shared_state(config: Config) -> SharedState:
+    """Get state loaded before fork or load it in the current process.
+
+    Parameters
+    ----------
+     config: Config
+
+    Returns
+    -------
+     state: SharedState
+
+    """
+    if _preloaded is not None:
+        return _preloaded
+    return load_shared_state(config)
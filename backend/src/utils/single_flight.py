@@ -0,0 +1,74 @@
+"""Module for deduplication of concurrent identical calls."""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from prometheus_client import Counter
+
+COALESCED_CALLS = Counter(
+    "single_flight_coalesced", "Count of calls which joined identical call already in flight", ["name"]
+)
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Run only one call for a key at a time, concurrent callers with the same key share its result.
+
+    The call runs in a separate task, so cancellation of one caller does not cancel the call for others.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         name: name of calls in metrics
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.name = name
+        self.calls: Dict[Hashable, "asyncio.Task[T]"] = dict()
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run func or join call in flight with the same key.
+
+        Parameters
+        ----------
+         key: key of call
+         func: function making the call
+
+        Returns
+        -------
+         result of call
+
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.finish(key, done))
+        else:
+            COALESCED_CALLS.labels(name=self.name).inc()
+        return await asyncio.shield(task)
+
+    def finish(self, key: Hashable, task: "asyncio.Task[T]") -> None:
+        """Forget finished call.
+
+        Parameters
+        ----------
+         key: key of call
+         task: finished task
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.calls.pop(key, None)
+        if not task.cancelled():
+            # the exception is retrieved, so it is not logged if all callers were cancelled
+            task.exception()
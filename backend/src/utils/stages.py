@@ -0,0 +1,90 @@
+"""Module for measuring latency of stages of predictions."""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import Histogram
+
+from src.config import app_config
+
+STAGES = ("geocoding", "geocoding_request", "amenity_counts", "features", "model")
+# predictions served by the primary model, by the candidate model, mirrored to shadow models and synthetic ones
+# of warm-up, so additional predictions don't change time of stages of the primary model
+PREDICTION_KINDS = ("primary", "candidate", "shadow", "warm_up")
+STAGE_TIME = Histogram(
+    "prediction_stage_seconds",
+    "Time of stages of predictions",
+    ["stage", "model"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+STAGE_TIME_CHILDREN = {
+    (stage, kind): STAGE_TIME.labels(stage=stage, model=kind) for stage in STAGES for kind in PREDICTION_KINDS
+}
+
+# durations of stages measured in process of pool, they are returned to the application with predictions
+_collected: Optional[Dict[str, float]] = None
+
+
+@contextmanager
+def measure_stage(stage: str, kind: str = "primary") -> Iterator[None]:
+    """Measure time of stage and observe it in histogram.
+
+    Nothing is measured if STAGE_METRICS_ENABLED is false.
+
+    Parameters
+    ----------
+     stage: one of STAGES
+     kind: one of PREDICTION_KINDS, geocoding of requests is observed as primary
+
+    Returns
+    -------
+     context manager: Iterator[None]
+
+    """
+    if not app_config.STAGE_METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if _collected is not None:
+            _collected[stage] = _collected.get(stage, 0.0) + duration
+        else:
+            STAGE_TIME_CHILDREN[stage, kind].observe(duration)
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """Collect durations of stages instead of observing them, metrics of process of pool are not exported.
+
+    Returns
+    -------
+     context manager with durations by stage: Iterator[Dict[str, float]]
+
+    """
+    global _collected
+    _collected = {}
+    try:
+        yield _collected
+    finally:
+        _collected = None
+
+
+def observe_stages(durations: Dict[str, float], kind: str) -> None:
+    """Observe durations collected in another process.
+
+    Parameters
+    ----------
+     durations: durations by stage
+     kind: one of PREDICTION_KINDS
+
+    Returns
+    -------
+     nothing
+
+    """
+    for stage, duration in durations.items():
+        STAGE_TIME_CHILDREN[stage, kind].observe(duration)
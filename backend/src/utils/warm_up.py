@@ -0,0 +1,59 @@
+"""Module for warming up the application before serving traffic."""
+
+import asyncio
+import os
+import time
+from typing import Any
+
+from prometheus_client import Gauge
+
+from src.logger import logger
+from src.utils.memory import track_memory_usage
+from src.utils.prediction import make_synthetic_apartments, warm_up
+
+WARM_UP_TIME = Gauge(
+    "warm_up_duration_seconds", "Time of warm-up of the application after start", multiprocess_mode="livemax"
+)
+
+
+async def warm_up_application(state: Any, count: int) -> None:
+    """Make synthetic predictions with all models and the executor, then mark application as ready.
+
+    Parameters
+    ----------
+     state: application state with model, amenities_data, executor and model_router
+     count: count of synthetic apartments
+
+    Returns
+    -------
+     nothing
+
+    """
+    start = time.perf_counter()
+    try:
+        if count > 0:
+            models = [state.model]
+            if state.model_router is not None:
+                models.extend(state.model_router.models.values())
+            for model in models:
+                await asyncio.to_thread(warm_up, model, state.amenities_data, count)
+            data, lats, lons = make_synthetic_apartments(count)
+            # process pool starts its workers and loads model in them on the first predictions
+            await asyncio.gather(
+                *[
+                    state.executor.predict(state.model, state.amenities_data, data, lats, lons, "warm_up")
+                    for _ in range(state.executor.workers)
+                ]
+            )
+    except Exception:
+        logger.exception("Warm-up failed, application is not ready")
+        return
+    duration = time.perf_counter() - start
+    WARM_UP_TIME.set(duration)
+    state.ready = True
+    logger.info(f"Warmed up in {duration:.1f} s")
+    usage = track_memory_usage()
+    logger.info(
+        f"Memory of worker {os.getpid()}: "
+        + ", ".join(f"{kind} {value / 2 ** 20:.0f} MiB" for kind, value in usage.items())
+    )
@@ -0,0 +1,38 @@
+"""Tests of keys of the geocoding cache shared with the research pipeline."""
+
+import importlib.util
+import os
+import unittest
+
+from src.utils.geocoding_cache import normalize_address
+
+# store of the pipeline, which writes the same table as the cache of the service
+RESEARCH_STORE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "research", "src", "features", "geocoding_store.py"
+)
+ADDRESSES = [
+    "Москва, ул. Тверская, д. 1",
+    "  москва,   УЛ. ТВЕРСКАЯ,\tд. 1  ",
+    "MOSCOW, Tverskaya Street 1",
+    "Straße 1\nМосква",
+    "",
+]
+
+
+@unittest.skipUnless(os.path.exists(RESEARCH_STORE), "research is not checked out next to backend")
+class NormalizeAddressTest(unittest.TestCase):
+    """Service and pipeline normalize addresses to the same keys."""
+
+    def test_same_keys_as_research_store(self) -> None:
+        """normalize_address of the service matches the one of research/src/features/geocoding_store.py."""
+        spec = importlib.util.spec_from_file_location("geocoding_store", RESEARCH_STORE)
+        assert spec is not None and spec.loader is not None
+        geocoding_store = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(geocoding_store)
+        for address in ADDRESSES:
+            with self.subTest(address=address):
+                self.assertEqual(normalize_address(address), geocoding_store.normalize_address(address))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Tests of serving cached model versions when the registry is unreachable."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import catboost
+import mlflow
+from mlflow.exceptions import MlflowException
+
+from benchmarks.common import train_local_model
+from src.config import app_config
+from src.utils.models import NativeCatBoostModel, get_model_registry
+from src.utils.preload import load_shared_state
+
+UNREACHABLE_URI = "http://127.0.0.1:9"
+
+
+class OfflineFallbackTest(unittest.TestCase):
+    """Two versions of CatBoost model in a local MLflow registry, the first one is cached."""
+
+    def setUp(self) -> None:
+        """Register two versions and cache the first one."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tracking_uri = "file://" + os.path.join(self.tmp_dir.name, "mlruns")
+        mlflow.set_tracking_uri(self.tracking_uri)
+        model_path = os.path.join(self.tmp_dir.name, "model.cbm")
+        train_local_model(model_path, n_estimators=10, rows=200)
+        catboost_model = catboost.CatBoostRegressor()
+        catboost_model.load_model(model_path)
+        for _ in range(2):
+            with mlflow.start_run():
+                mlflow.catboost.log_model(catboost_model, "catboost", registered_model_name="catboost-reg-model")
+        self.config = app_config.model_copy(
+            update={
+                "MLFLOW_TRACKING_URI": self.tracking_uri,
+                "MODEL_NAME": "catboost-reg-model",
+                "MODEL_VERSION": "1",
+                "MODEL_FLAVOR": "catboost",
+                "MODEL_PATH": "",
+                "MODEL_ALIAS": "",
+                "MODEL_REGISTRY_PATH": "",
+                "MODEL_CACHE_DIR": os.path.join(self.tmp_dir.name, "cache"),
+                "MODEL_CACHE_OFFLINE_FALLBACK": True,
+            }
+        )
+        registry = get_model_registry(self.config)
+        registry.get_loader(registry.get_version())()
+        self.environ = mock.patch.dict(os.environ, {"MLFLOW_HTTP_REQUEST_MAX_RETRIES": "0"})
+        self.environ.start()
+
+    def tearDown(self) -> None:
+        """Remove registry and cache."""
+        self.environ.stop()
+        self.tmp_dir.cleanup()
+
+    def test_reports_cached_version(self) -> None:
+        """Version which is actually loaded from cache is served and reported instead of the requested one."""
+        config = self.config.model_copy(update={"MLFLOW_TRACKING_URI": UNREACHABLE_URI, "MODEL_VERSION": "2"})
+        state = load_shared_state(config)
+        self.assertEqual(state.model_version, "1")
+        self.assertIsInstance(state.model, NativeCatBoostModel)
+
+    def test_requested_version_when_registry_is_back(self) -> None:
+        """Requested version is served when the registry is reachable, so the reloader replaces fallback."""
+        config = self.config.model_copy(update={"MODEL_VERSION": "2"})
+        self.assertEqual(get_model_registry(config).get_version(), "2")
+
+    def test_fails_without_fallback(self) -> None:
+        """Unreachable registry is an error when fallback is disabled."""
+        config = self.config.model_copy(
+            update={"MLFLOW_TRACKING_URI": UNREACHABLE_URI, "MODEL_VERSION": "2", "MODEL_CACHE_OFFLINE_FALLBACK": False}
+        )
+        with self.assertRaises(MlflowException):
+            load_shared_state(config)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Tests of routing requests to additional models."""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import catboost
+import mlflow
+import numpy as np
+import pandas as pd
+from prometheus_client import REGISTRY
+from sklearn.linear_model import Ridge
+
+from benchmarks.common import train_local_model
+from src.config import app_config
+from src.utils.amenity import load_amenities_data
+from src.utils.model_router import ModelRouter
+from src.utils.models import NativeCatBoostModel, get_model_config, load_model
+from src.utils.prediction import make_synthetic_apartments
+
+AMENITY_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "static", "amenity")
+
+
+def get_model_stage_count(kind: str) -> float:
+    """Get count of observed model calls of kind of predictions.
+
+    Parameters
+    ----------
+     kind: kind of predictions
+
+    Returns
+    -------
+     count: float
+
+    """
+    value = REGISTRY.get_sample_value("prediction_stage_seconds_count", {"stage": "model", "model": kind})
+    return value or 0.0
+
+
+class ModelRouterTest(unittest.TestCase):
+    """Additional models registered in a local MLflow registry."""
+
+    def setUp(self) -> None:
+        """Register CatBoost model and sklearn model trained like research/src/models/linear_model.py."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tracking_uri = "file://" + os.path.join(self.tmp_dir.name, "mlruns")
+        mlflow.set_tracking_uri(tracking_uri)
+        model_path = os.path.join(self.tmp_dir.name, "model.cbm")
+        train_local_model(model_path, n_estimators=10, rows=200)
+        catboost_model = catboost.CatBoostRegressor()
+        catboost_model.load_model(model_path)
+        df = pd.get_dummies(
+            pd.DataFrame({"area of apartment": [30, 40, 50], "lat": [55.7, 55.8, 55.9]}),
+            columns=["area of apartment"],
+            drop_first=True,
+        )
+        sklearn_model = Ridge().fit(df.values, np.array([1.0, 2.0, 3.0]))
+        with mlflow.start_run():
+            mlflow.catboost.log_model(catboost_model, "catboost", registered_model_name="catboost-reg-model")
+            mlflow.sklearn.log_model(sklearn_model, "linear_model", registered_model_name="linear-model")
+        self.config = app_config.model_copy(update={"MLFLOW_TRACKING_URI": tracking_uri, "MODEL_CACHE_DIR": ""})
+
+    def tearDown(self) -> None:
+        """Remove registry."""
+        self.tmp_dir.cleanup()
+
+    def test_routes_to_catboost_model(self) -> None:
+        """Registered CatBoost model is loaded natively and serves candidate requests."""
+        spec = "catboost-reg-model/1"
+        model = load_model(get_model_config(self.config, spec))
+        self.assertIsInstance(model, NativeCatBoostModel)
+        state = SimpleNamespace(amenities_data=load_amenities_data(AMENITY_DIR))
+        router = ModelRouter(state, {spec: model}, spec, 1.0, [], 0.0, workers=1, max_pending=1)
+        try:
+            self.assertEqual(router.choose(), spec)
+            data, lats, lons = make_synthetic_apartments(1)
+            primary_count = get_model_stage_count("primary")
+            candidate_count = get_model_stage_count("candidate")
+            value = asyncio.run(router.predict(spec, data[0], lats[0], lons[0]))
+            self.assertIsInstance(value, float)
+            # candidate predictions are not observed as time of the primary model
+            self.assertEqual(get_model_stage_count("primary"), primary_count)
+            self.assertEqual(get_model_stage_count("candidate"), candidate_count + 1)
+        finally:
+            router.close()
+
+    def test_rejects_non_catboost_model(self) -> None:
+        """Model trained on one-hot encoded features can't get features of the service, so it is not loaded."""
+        with self.assertRaisesRegex(ValueError, "is not a CatBoost model"):
+            load_model(get_model_config(self.config, "linear-model/1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
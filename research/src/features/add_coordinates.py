@@ -1,97 +1,307 @@
 """Script for adding geo data."""
 
+import asyncio
 import os
-from typing import Optional
+import random
+import time
+from typing import Any, Optional
 
+import aiohttp
 import click
 import pandas as pd
-import requests
 from dotenv import load_dotenv
+from geocoding_store import GeocodingStore, normalize_address
 
 load_dotenv()
 
 GEOAPIFY_TOKEN = os.environ.get("GEOAPIFY_TOKEN", "")
 GEOAPIFY_URL = "https://api.geoapify.com/v1/geocode/search"
+# statuses after which request is repeated
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 # column names
 ADDRESS_FEATURE = "physical address"
 LATITUDE_FEATURE = "lat"
-LATITUDE_INDEX = 1
 LONGITUDE_FEATURE = "lon"
-LONGITUDE_INDEX = 2
 
 
-def get_coordinates_with_geoapify_by_address(address: str) -> Optional[tuple[float, float]]:
-    """Get coordinates with geocoding api.
+class RetryableError(Exception):
+
+    """Error after which request can succeed."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         message: str
+         retry_after: seconds to wait requested by server
+
+        Returns
+        -------
+         nothing
+
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+
+    """Rate limiter allowing bursts of capacity requests and rate requests per second on average."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Set values.
+
+        Parameters
+        ----------
+         rate: requests per second
+         capacity: max count of requests in burst
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for token.
+
+        Returns
+        -------
+         nothing
+
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def get_coordinates_from_response(data: dict[str, Any]) -> Optional[tuple[float, float]]:
+    """Get coordinates of the first full match.
+
+    Parameters
+    ----------
+     data: response of geocoding api
+
+    Returns
+    -------
+     latitude and longitude: Optional[tuple[float, float]]
+
+    """
+    for item in data["results"]:
+        if item["rank"]["match_type"] == "full_match":
+            return item["lat"], item["lon"]
+    return None
+
+
+async def get_coordinates_with_geoapify_by_address(
+    session: aiohttp.ClientSession,
+    url: str,
+    address: str,
+    bucket: TokenBucket,
+    max_retries: int,
+    backoff: float,
+) -> Optional[tuple[float, float]]:
+    """Get coordinates with geocoding api, retrying rate limited and failed requests with exponential backoff.
 
     Parameters
     ----------
+     session: aiohttp.ClientSession
+     url: url of geocoding api
      address: str
-    
+     bucket: rate limiter of requests
+     max_retries: count of retries
+     backoff: delay before the first retry in seconds
+
     Returns
     -------
      latitude and longitude: Optional[tuple[float, float]]
-    
+
+    """
+    params = {
+        "text": address,
+        "lang": "en",
+        "filter": "circle:37.62354,55.75197,40000",
+        "format": "json",
+        "apiKey": GEOAPIFY_TOKEN,
+    }
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status in RETRY_STATUSES:
+                    retry_after_header = response.headers.get("Retry-After", "")
+                    raise RetryableError(
+                        f"status {response.status}",
+                        float(retry_after_header) if retry_after_header.isdigit() else None,
+                    )
+                response.raise_for_status()
+                data = await response.json()
+            return get_coordinates_from_response(data)
+        except (RetryableError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as ex:
+            if attempt == max_retries:
+                raise
+            delay = ex.retry_after if isinstance(ex, RetryableError) else None
+            await asyncio.sleep(delay or backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+    return None
+
+
+async def geocode_addresses(
+    addresses: list[str],
+    store: GeocodingStore,
+    url: str,
+    concurrency: int,
+    rate: float,
+    max_retries: int,
+    timeout: float,
+) -> None:
+    """Geocode addresses which are not in store.
+
+    Parameters
+    ----------
+     addresses: list[str]
+     store: GeocodingStore
+     url: url of geocoding api
+     concurrency: count of concurrent requests
+     rate: requests per second
+     max_retries: count of retries of request
+     timeout: timeout of request in seconds
+
+    Returns
+    -------
+     nothing
+
     """
+    known = store.get_many(addresses)
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    # addresses which differ only in case and spaces are requested once
+    queued = set()
+    for address in addresses:
+        key = normalize_address(address)
+        if address not in known and key not in queued:
+            queued.add(key)
+            queue.put_nowait(address)
+    total = queue.qsize()
+    click.echo(f"{len(known)} addresses are known in store, {total} to geocode")
+    if total == 0:
+        return
+    # token is needed only for requests, so reruns with all addresses in store work without it
     if GEOAPIFY_TOKEN == "":
         raise ValueError("No GEOAPIFY_TOKEN in environment")
-    response = requests.get(
-        GEOAPIFY_URL,
-        params={
-            "text": address,
-            "lang": "en",
-            "filter": "circle:37.62354,55.75197,40000",
-            "format": "json",
-            "apiKey": GEOAPIFY_TOKEN,
-        },
-    )
-    data = response.json()
-    result = None
-    for item in data["results"]:
-        if item["rank"]["match_type"] == "full_match":
-            result = (item["lat"], item["lon"])
-            break
-    return result
+    bucket = TokenBucket(rate, capacity=max(1.0, rate))
+    done = 0
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        nonlocal done
+        while not queue.empty():
+            address = queue.get_nowait()
+            try:
+                coordinates = await get_coordinates_with_geoapify_by_address(
+                    session, url, address, bucket, max_retries, backoff=1.0
+                )
+            except Exception as ex:
+                click.echo(f"error: {ex!r} with address: {address}")
+            else:
+                store.put(address, coordinates)
+            done += 1
+            if done % 100 == 0:
+                click.echo(f"{round(done / total * 100, 2)}%")
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
 
 
 @click.command()
 @click.argument("input_feature_file", type=click.Path(readable=True))
 @click.argument("output_feature_file", type=click.Path(writable=True))
-def cli(input_feature_file: str, output_feature_file: str) -> None:
+@click.option(
+    "--store", type=click.STRING, default="", help="SQLite store of results, default is output file + .sqlite"
+)
+@click.option("--ttl-days", type=click.FLOAT, default=365.0, help="Days to keep found coordinates in store")
+@click.option("--negative-ttl-days", type=click.FLOAT, default=30.0, help="Days to keep not found addresses in store")
+@click.option("--url", type=click.STRING, default=GEOAPIFY_URL, help="Url of geocoding api")
+@click.option("--concurrency", type=click.INT, default=10, help="Count of concurrent requests")
+@click.option("--rate", type=click.FLOAT, default=5.0, help="Requests per second allowed by plan")
+@click.option("--max-retries", type=click.INT, default=5, help="Retries of failed request")
+@click.option("--timeout", type=click.FLOAT, default=10.0, help="Timeout of request in seconds")
+@click.option("--incremental", is_flag=True, help="Reuse coordinates found by previous run")
+def cli(
+    input_feature_file: str,
+    output_feature_file: str,
+    store: str,
+    ttl_days: float,
+    negative_ttl_days: float,
+    url: str,
+    concurrency: int,
+    rate: float,
+    max_retries: int,
+    timeout: float,
+    incremental: bool,
+) -> None:
     """Add coordinates to data.
-    
+
+    Only addresses which are not in store are geocoded, concurrently, and their results are committed to store
+    at once, so rerun after a crash and runs with new data geocode only the remaining addresses.
+    The serving service reads the same store as its geocoding cache.
+
     Parameters
     ----------
      input_feature_file: input filepath
      output_feature_file: output filepath
-     
+     store: filepath of SQLite store
+     ttl_days: days to keep found coordinates
+     negative_ttl_days: days to keep not found addresses
+     url: url of geocoding api
+     concurrency: count of concurrent requests
+     rate: requests per second
+     max_retries: count of retries of request
+     timeout: timeout of request in seconds
+     incremental: take coordinates of addresses from previous output, only others are looked up in store
+
     Returns
     -------
      nothing
-    
+
     """
     df = pd.read_csv(input_feature_file)
     df = df[[ADDRESS_FEATURE]]
     df.drop_duplicates(inplace=True)
-    df[LATITUDE_FEATURE] = None
-    df[LONGITUDE_FEATURE] = None
-    for index in range(len(df)):
-        if index % 100 == 0:
-            click.echo(f"{round(index / len(df) * 100, 2)}%")
-        address = df.iloc[index][ADDRESS_FEATURE]
-        try:
-            coordinates = get_coordinates_with_geoapify_by_address(address)
-        except Exception as ex:
-            click.echo(f"error: {ex} with address: {address}")
-            continue
-        if not coordinates:
-            continue
-        lat, lon = coordinates
-        df.iat[index, LATITUDE_INDEX] = lat
-        df.iat[index, LONGITUDE_INDEX] = lon
+    addresses = df[ADDRESS_FEATURE].tolist()
+    results: dict[str, Optional[tuple[float, float]]] = dict()
+    if incremental and os.path.exists(output_feature_file):
+        previous_df = pd.read_csv(output_feature_file).dropna(subset=[LATITUDE_FEATURE, LONGITUDE_FEATURE])
+        results = dict(
+            zip(previous_df[ADDRESS_FEATURE], zip(previous_df[LATITUDE_FEATURE], previous_df[LONGITUDE_FEATURE]))
+        )
+        click.echo(f"{sum(address in results for address in addresses)} addresses are found by previous run")
+    new_addresses = [address for address in addresses if address not in results]
+    geocoding_store = GeocodingStore(
+        store or output_feature_file + ".sqlite", ttl=ttl_days * 86400, negative_ttl=negative_ttl_days * 86400
+    )
+    try:
+        asyncio.run(geocode_addresses(new_addresses, geocoding_store, url, concurrency, rate, max_retries, timeout))
+        results.update(geocoding_store.get_many(new_addresses))
+    finally:
+        geocoding_store.close()
+    coordinates = [results.get(address) for address in addresses]
+    df[LATITUDE_FEATURE] = [item[0] if item is not None else None for item in coordinates]
+    df[LONGITUDE_FEATURE] = [item[1] if item is not None else None for item in coordinates]
     click.echo("100%")
     df.to_csv(output_feature_file, index=False)
 
-    
+
 if __name__ == "__main__":
-    cli()
\ No newline at end of file
+    cli()
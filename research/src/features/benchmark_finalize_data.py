@@ -0,0 +1,111 @@
+"""Script for comparing timings and outputs of engines of finalize_data.
+
+It imports clean_raw_data and finalize_data as modules next to it, so it is run by path from the research
+directory, like the other scripts:
+
+    poetry run python src/features/benchmark_finalize_data.py data.csv -af data/external/eat.json
+"""
+
+import filecmp
+import os
+import tempfile
+import time
+from math import cos, pi
+
+import click
+import numpy as np
+import pandas as pd
+from clean_raw_data import cli as clean_cli
+from finalize_data import ADDRESS_FEATURE, EARTH_RADIUS, LAT_FEATURE, LON_FEATURE
+from finalize_data import cli as finalize_cli
+
+# center and radius of the circle used in geocoding requests
+CENTER = (55.75197, 37.62354)
+RADIUS = 20000
+
+
+def make_coordinates(cleaned_file: str, coordinates_file: str, seed: int) -> None:
+    """Write random coordinates in Moscow for addresses, used when there are no geocoded ones.
+
+    Parameters
+    ----------
+     cleaned_file: file with cleaned data
+     coordinates_file: output file in the format of add_coordinates
+     seed: int
+
+    Returns
+    -------
+     nothing
+
+    """
+    df = pd.read_csv(cleaned_file)[[ADDRESS_FEATURE]].drop_duplicates()
+    rng = np.random.default_rng(seed)
+    distance = RADIUS * np.sqrt(rng.random(len(df)))
+    angle = rng.uniform(0, 2 * pi, len(df))
+    meters_per_degree = EARTH_RADIUS * pi / 180.0
+    df[LAT_FEATURE] = CENTER[0] + distance * np.sin(angle) / meters_per_degree
+    df[LON_FEATURE] = CENTER[1] + distance * np.cos(angle) / (meters_per_degree * cos(CENTER[0] * pi / 180.0))
+    df.to_csv(coordinates_file, index=False)
+
+
+@click.command()
+@click.argument("raw_data_file", type=click.Path(readable=True))
+@click.option("--coordinates-file", type=click.STRING, default="", help="Geocoded addresses, random if not set")
+@click.option("--amenity-files", "-af", type=click.STRING, help="Files with amenity info", multiple=True, default=[])
+@click.option("--workers", type=click.INT, default=1, help="Also build with this count of processes")
+@click.option("--chunk-size", type=click.INT, default=10000, help="Points in chunk of vectorized engine")
+@click.option("--seed", type=click.INT, default=0)
+def cli(
+    raw_data_file: str, coordinates_file: str, amenity_files: list[str], workers: int, chunk_size: int, seed: int
+) -> None:
+    """Clean raw data, build dataset with every engine, compare timings and output files.
+
+    Parameters
+    ----------
+     raw_data_file: str
+     coordinates_file: str
+     amenity_files: list[str]
+     workers: int
+     chunk_size: int
+     seed: int
+
+    Returns
+    -------
+     nothing
+
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cleaned_file = os.path.join(tmp_dir, "cleaned_data.csv")
+        clean_cli([raw_data_file, cleaned_file], standalone_mode=False)
+        if not coordinates_file:
+            coordinates_file = os.path.join(tmp_dir, "geo_data.csv")
+            make_coordinates(cleaned_file, coordinates_file, seed)
+        amenity_options = [item for path in amenity_files for item in ("-af", path)]
+        runs = {
+            "loop": ["--engine", "loop"],
+            "vectorized": ["--engine", "vectorized", "--chunk-size", str(chunk_size)],
+        }
+        if workers > 1:
+            runs[f"vectorized, {workers} workers"] = [*runs["vectorized"], "--workers", str(workers)]
+        timings = dict()
+        for number, (name, options) in enumerate(runs.items()):
+            output_file = os.path.join(tmp_dir, f"{number}.csv")
+            start = time.perf_counter()
+            finalize_cli(
+                [cleaned_file, coordinates_file, output_file, *amenity_options, *options], standalone_mode=False
+            )
+            timings[name] = time.perf_counter() - start
+        rows = len(pd.read_csv(os.path.join(tmp_dir, "0.csv")))
+        identical = all(
+            filecmp.cmp(os.path.join(tmp_dir, "0.csv"), os.path.join(tmp_dir, f"{number}.csv"), False)
+            for number in range(1, len(runs))
+        )
+    click.echo(f"rows: {rows}, output files are identical: {identical}")
+    for name, timing in timings.items():
+        click.echo(f"{name:>22}: {timing:.2f} s, speedup {timings['loop'] / timing:.1f}x")
+    if not identical:
+        raise click.ClickException("Output files differ")
+
+
+if __name__ == "__main__":
+    cli()
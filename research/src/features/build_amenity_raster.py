@@ -0,0 +1,167 @@
+"""Script for precomputing amenity counts on a lat/lon grid for the serving service."""
+
+import json
+import os
+from math import cos, pi
+from typing import Any
+
+import click
+import numpy as np
+import numpy.typing as npt
+from finalize_data import DISTANCES, EARTH_RADIUS, load_amenity_data
+
+RASTER_FORMAT_VERSION = 1
+INDEX_FILE = "index.json"
+COUNTS_FILE = "counts.npy"
+# center and radius of the circle used in geocoding requests of the service
+CENTER = (55.75197, 37.62354)
+RADIUS = 40000
+
+
+def build_row_counts(
+    lat: float,
+    lon0: float,
+    lon_step: float,
+    cols: int,
+    amenity_lat: npt.NDArray[np.float64],
+    amenity_lon: npt.NDArray[np.float64],
+    codes: npt.NDArray[np.int64],
+    type_count: int,
+) -> npt.NDArray[np.int64]:
+    """Count amenities of every type within DISTANCES from centers of cells of one grid row.
+
+    For a fixed latitude the cells closer than radius to an amenity form one interval of longitudes,
+    so counts are accumulated as differences at interval bounds.
+
+    Parameters
+    ----------
+     lat: latitude of row in radians
+     lon0: longitude of the first cell in radians
+     lon_step: longitude step in radians
+     cols: count of cells in row
+     amenity_lat: latitudes of amenities in radians
+     amenity_lon: longitudes of amenities in radians
+     codes: type of every amenity
+     type_count: count of types
+
+    Returns
+    -------
+     counts with shape (cols, type count * count of DISTANCES): np.ndarray
+
+    """
+    counts = np.empty((cols, type_count * len(DISTANCES)), dtype=np.int64)
+    sin_delta_lat = np.sin((amenity_lat - lat) / 2) ** 2
+    cos_product = np.cos(lat) * np.cos(amenity_lat)
+    for index, distance in enumerate(DISTANCES):
+        limit = np.sin(distance / EARTH_RADIUS / 2) ** 2
+        ratio = (limit - sin_delta_lat) / cos_product
+        near = ratio > 0
+        delta_lon = 2 * np.arcsin(np.sqrt(np.minimum(ratio[near], 1.0)))
+        # cells with centers strictly inside (lon - delta_lon, lon + delta_lon)
+        low = np.floor((amenity_lon[near] - delta_lon - lon0) / lon_step).astype(np.int64) + 1
+        high = np.ceil((amenity_lon[near] + delta_lon - lon0) / lon_step).astype(np.int64)
+        low = np.clip(low, 0, cols)
+        high = np.clip(high, 0, cols)
+        feature_codes = codes[near] * len(DISTANCES) + index
+        size = type_count * len(DISTANCES) * (cols + 1)
+        diff = np.bincount(feature_codes * (cols + 1) + low, minlength=size)
+        diff -= np.bincount(feature_codes * (cols + 1) + high, minlength=size)
+        feature_counts = np.cumsum(diff.reshape(-1, cols + 1)[:, :cols], axis=1)
+        counts[:, index::len(DISTANCES)] = feature_counts[index::len(DISTANCES)].T
+    return counts
+
+
+def build_amenity_raster(
+    amenity_data: dict[str, list[dict[str, float]]], output_dir: str, cell_size: float, radius: float
+) -> None:
+    """Write amenity counts for centers of grid cells covering the circle around CENTER.
+
+    counts.npy has shape (rows, cols, features) and uint16 type, index.json has the grid
+    and names of features in the order of the last axis.
+
+    Parameters
+    ----------
+     amenity_data: dict with amenity as key and list coordinates as value
+     output_dir: str
+     cell_size: size of cell in meters
+     radius: radius of covered circle in meters
+
+    Returns
+    -------
+     nothing
+
+    """
+    types = [name for name in amenity_data if amenity_data[name]]
+    codes = np.repeat(np.arange(len(types)), [len(amenity_data[name]) for name in types])
+    amenity_lat = np.array([float(item["lat"]) for name in types for item in amenity_data[name]]) * pi / 180.0
+    amenity_lon = np.array([float(item["lon"]) for name in types for item in amenity_data[name]]) * pi / 180.0
+
+    meters_per_degree = EARTH_RADIUS * pi / 180.0
+    lat_step = cell_size / meters_per_degree
+    lon_step = cell_size / (meters_per_degree * cos(CENTER[0] * pi / 180.0))
+    rows = 2 * int(np.ceil(radius / cell_size)) + 1
+    cols = rows
+    lat0 = CENTER[0] - lat_step * (rows // 2)
+    lon0 = CENTER[1] - lon_step * (cols // 2)
+
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    features = len(types) * len(DISTANCES)
+    counts: "np.memmap[Any, np.dtype[np.uint16]]" = np.lib.format.open_memmap(  # type: ignore[no-untyped-call]
+        os.path.join(output_dir, COUNTS_FILE), mode="w+", dtype=np.uint16, shape=(rows, cols, features)
+    )
+    for row in range(rows):
+        row_counts = build_row_counts(
+            (lat0 + row * lat_step) * pi / 180.0,
+            lon0 * pi / 180.0,
+            lon_step * pi / 180.0,
+            cols,
+            amenity_lat,
+            amenity_lon,
+            codes,
+            len(types),
+        )
+        counts[row] = np.minimum(row_counts, np.iinfo(np.uint16).max)
+    counts.flush()
+    index = dict(
+        version=RASTER_FORMAT_VERSION,
+        columns=[f"{name}_{distance}" for name in types for distance in DISTANCES],
+        lat0=lat0,
+        lon0=lon0,
+        lat_step=lat_step,
+        lon_step=lon_step,
+        cell_size=cell_size,
+    )
+    # index is written last, raster without it is treated as missing
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+
+@click.command()
+@click.argument("output_dir", type=click.Path(writable=True))
+@click.option("--amenity-files", "-af", type=click.STRING, help="Files with amenity info", multiple=True, default=[])
+@click.option("--cell-size", type=click.FLOAT, default=50.0, help="Size of grid cell in meters")
+@click.option("--radius", type=click.FLOAT, default=RADIUS, help="Radius of covered circle in meters")
+def cli(output_dir: str, amenity_files: list[str], cell_size: float, radius: float) -> None:
+    """Build amenity raster.
+
+    Parameters
+    ----------
+     output_dir: str
+     amenity_files: list[str]
+     cell_size: float
+     radius: float
+
+    Returns
+    -------
+     nothing
+
+    """
+    amenity_data = load_amenity_data(amenity_files)
+    build_amenity_raster(amenity_data, output_dir, cell_size, radius)
+
+
+if __name__ == "__main__":
+    cli()
@@ -6,6 +6,7 @@ from typing import Union
 import click
 import numpy as np
 import pandas as pd
+from incremental import get_fingerprint, get_row_keys, load_state, save_output
 
 ELEVATOR_FEATURE = 'elevator'
 FLOORS_FEATURE = 'number of floors'
@@ -153,25 +154,18 @@ def get_room_count_by_name(room_name: str) -> int:
     raise ValueError(f"Unknown room type: {room_name}, {type(room_name)}")
 
 
-@click.command()
-@click.argument("input_feature_file", type=click.Path(readable=True))
-@click.argument("output_feature_file", type=click.Path(writable=True))
-def cli(input_feature_file: str, output_feature_file: str) -> None:
-    """Clean data.
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean rows of raw data, index of kept rows is preserved.
     
     Parameters
     ----------
-     input_feature_file: input filepath
-     output_feature_file: output filepath
+     df: raw data without duplicates
     
     Returns
     -------
-     nothing
+     cleaned data: pd.DataFrame
     
     """
-    df = pd.read_csv(input_feature_file)
-    df.drop_duplicates(inplace=True)
-    
     for feature in NON_NULL_FEATURES:
         df = df[df[feature].notna()]
     # address
@@ -198,12 +192,74 @@ def cli(input_feature_file: str, output_feature_file: str) -> None:
     min_elevator_counts = df[FLOORS_FEATURE].apply(get_min_elevator_count_by_floor_count).values
     df[ELEVATOR_FEATURE] = np.where(df[ELEVATOR_FEATURE].isna(), min_elevator_counts, df[ELEVATOR_FEATURE].values)
     df[ELEVATOR_FEATURE] = df[ELEVATOR_FEATURE].replace({'нет': 0}).astype(np.int64)
-    # save
-    df[ALL_FEATURES].to_csv(output_feature_file, index=False)
+    return df[ALL_FEATURES]
+
+
+def clean_new_data(df: pd.DataFrame, input_feature_file: str, output_feature_file: str) -> pd.DataFrame:
+    """Clean only rows which are not processed by previous run and merge them with its output.
+    
+    Rows are identified by hash of their raw text, so changed rows are cleaned again, and cleaned rows
+    whose raw rows are removed are dropped from output.
+    
+    Parameters
+    ----------
+     df: raw data
+     input_feature_file: input filepath
+     output_feature_file: output filepath
+    
+    Returns
+    -------
+     cleaned data: pd.DataFrame
+    
+    """
+    fingerprint = get_fingerprint([__file__])
+    state = load_state(output_feature_file, fingerprint)
+    keys = get_row_keys(input_feature_file)
+    unique = ~keys.duplicated()
+    df, keys = df[unique.values], keys[unique]
+    new = ~keys.isin(set(state["keys"]) if state else set())
+    click.echo(f"{len(keys) - new.sum()} rows are processed by previous run, {new.sum()} new rows")
+    cleaned = clean_data(df[new.values].copy()) if new.any() else pd.DataFrame(columns=ALL_FEATURES)
+    output_keys = keys[cleaned.index].tolist()
+    if state:
+        previous_df = pd.read_csv(output_feature_file)
+        previous_keys = pd.Series(state["output_keys"], dtype=object)
+        kept = previous_keys.isin(set(keys)).values
+        cleaned = pd.concat([previous_df[kept], cleaned], ignore_index=True)
+        output_keys = previous_keys[kept].tolist() + output_keys
+    save_output(cleaned, output_feature_file, fingerprint, {"keys": keys.tolist(), "output_keys": output_keys})
+    return cleaned
+
+
+@click.command()
+@click.argument("input_feature_file", type=click.Path(readable=True))
+@click.argument("output_feature_file", type=click.Path(writable=True))
+@click.option("--incremental", is_flag=True, help="Clean only rows which are new since previous run")
+def cli(input_feature_file: str, output_feature_file: str, incremental: bool) -> None:
+    """Clean data.
+    
+    Parameters
+    ----------
+     input_feature_file: input filepath
+     output_feature_file: output filepath
+     incremental: clean only new rows and merge them with previous output
+    
+    Returns
+    -------
+     nothing
+    
+    """
+    df = pd.read_csv(input_feature_file)
+    if incremental:
+        df = clean_new_data(df, input_feature_file, output_feature_file)
+    else:
+        df.drop_duplicates(inplace=True)
+        df = clean_data(df)
+        # save
+        df.to_csv(output_feature_file, index=False)
     # logging
-    click.echo(df[ALL_FEATURES].info())
+    click.echo(df.info())
 
 
 if __name__ == "__main__":
     cli()
-        
\ No newline at end of file
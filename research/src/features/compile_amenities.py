@@ -0,0 +1,81 @@
+"""Script for compiling amenity files into binary snapshot for the serving service."""
+
+import json
+import os
+
+import click
+import numpy as np
+from finalize_data import load_amenity_data
+
+SNAPSHOT_FORMAT_VERSION = 1
+INDEX_FILE = "index.json"
+RADIANS_FILE = "radians.npy"
+XYZ_FILE = "xyz.npy"
+
+
+def compile_amenities(amenity_data: dict[str, list[dict[str, float]]], output_dir: str) -> None:
+    """Write amenity coordinates as arrays which can be memory-mapped.
+
+    radians.npy has rows of latitudes, longitudes in radians and cosines of latitudes,
+    xyz.npy has points on the unit sphere for the spatial index, index.json has amenity types
+    and count of points of every type in the order of arrays.
+
+    Parameters
+    ----------
+     amenity_data: dict with amenity as key and list coordinates as value
+     output_dir: str
+
+    Returns
+    -------
+     nothing
+
+    """
+    types = [name for name in amenity_data if amenity_data[name]]
+    points = np.array(
+        [(float(item["lat"]), float(item["lon"])) for name in types for item in amenity_data[name]], dtype=np.float64
+    ).reshape(-1, 2)
+    # the same operations as in the service, so radians are bit-identical
+    lat = points[:, 0] * np.pi / 180.0
+    lon = points[:, 1] * np.pi / 180.0
+    cos_lat = np.cos(lat)
+    radians = np.stack((lat, lon, cos_lat))
+    xyz = np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    np.save(os.path.join(output_dir, RADIANS_FILE), radians)
+    np.save(os.path.join(output_dir, XYZ_FILE), xyz)
+    index = dict(
+        version=SNAPSHOT_FORMAT_VERSION,
+        types=types,
+        counts=[len(amenity_data[name]) for name in types],
+    )
+    # index is written last, snapshot without it is treated as missing
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+
+@click.command()
+@click.argument("output_dir", type=click.Path(writable=True))
+@click.option("--amenity-files", "-af", type=click.STRING, help="Files with amenity info", multiple=True, default=[])
+def cli(output_dir: str, amenity_files: list[str]) -> None:
+    """Compile amenity snapshot.
+
+    Parameters
+    ----------
+     output_dir: str
+     amenity_files: list[str]
+
+    Returns
+    -------
+     nothing
+
+    """
+    amenity_data = load_amenity_data(amenity_files)
+    compile_amenities(amenity_data, output_dir)
+
+
+if __name__ == "__main__":
+    cli()
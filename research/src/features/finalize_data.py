@@ -2,15 +2,28 @@
 
 import json
 import os
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from math import asin, cos, pi, sin, sqrt
+from typing import Iterator, Optional
 
 import click
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
+from incremental import get_fingerprint, load_state, save_output
+from sklearn.neighbors import BallTree
 
 LAT_FEATURE = 'lat'
 LON_FEATURE = 'lon'
 ADDRESS_FEATURE = "physical address"
 DISTANCES = [500, 1500, 3000]
+EARTH_RADIUS = 6372795
+# margin of the spatial index search radius, candidates are checked with get_distance
+INDEX_MARGIN = 1.0
+# distances closer than this to a radius are rechecked with get_distance in vectorized counting
+BORDER_TOLERANCE = 1e-3
 
 def get_distance(llong1: float, llat1: float, llong2: float, llat2: float) -> float:
     """Calculate distance between two points.
@@ -27,7 +40,7 @@ def get_distance(llong1: float, llat1: float, llong2: float, llat2: float) -> fl
      distance: float
     
     """
-    rad = 6372795
+    rad = EARTH_RADIUS
     lat1 = llat1 * pi / 180.0
     lat2 = llat2 * pi / 180.0
     long1 = llong1 * pi / 180.0
@@ -63,12 +76,395 @@ def load_amenity_data(amenity_files: list[str]) -> dict[str, list[dict[str, floa
     return amenity_data
 
 
+def build_amenity_index(amenity_data: dict[str, list[dict[str, float]]]) -> dict[str, BallTree]:
+    """Build haversine spatial index for every amenity.
+    
+    Parameters
+    ----------
+     amenity_data: dict[str, list[dict[str, float]]]
+    
+    Returns
+    -------
+     dict with amenity as key and index of its coordinates as value: dict[str, BallTree]
+    
+    """
+    amenity_index = dict()
+    for amenity, items in amenity_data.items():
+        if not items:
+            continue
+        coordinates = np.radians([[item["lat"], item["lon"]] for item in items]).reshape(-1, 2)
+        amenity_index[amenity] = BallTree(coordinates, metric="haversine")
+    return amenity_index
+
+
+def get_nearby_amenities(
+    lat: float, lon: float, items: list[dict[str, float]], index: Optional[BallTree]
+) -> list[dict[str, float]]:
+    """Get amenities which can be closer than max of DISTANCES to point.
+    
+    Parameters
+    ----------
+     lat: float
+     lon: float
+     items: list[dict[str, float]]
+     index: Optional[BallTree]
+    
+    Returns
+    -------
+     nearby amenities: list[dict[str, float]]
+    
+    """
+    if index is None:
+        return []
+    radius = (max(DISTANCES) + INDEX_MARGIN) / EARTH_RADIUS
+    indices = index.query_radius(np.radians([[lat, lon]]), r=radius)[0]
+    return [items[i] for i in sorted(indices)]
+
+
+def add_amenity_counts_loop(
+    coordinates_df: pd.DataFrame, amenity_data: dict[str, list[dict[str, float]]], amenity_index: dict[str, BallTree]
+) -> None:
+    """Add amenity counts to coordinates row by row, reference implementation of add_amenity_counts.
+    
+    Parameters
+    ----------
+     coordinates_df: pd.DataFrame
+     amenity_data: dict[str, list[dict[str, float]]]
+     amenity_index: dict[str, BallTree]
+    
+    Returns
+    -------
+     nothing
+    
+    """
+    for amenity in amenity_data:
+        for distance in DISTANCES:
+            key = amenity + "_" + str(distance)
+            coordinates_df[key] = 0
+    for index in range(len(coordinates_df)):
+        if index % 100 == 0:
+            click.echo(f"{round(index / len(coordinates_df) * 100, 2)}%")
+        lon1, lat1 = coordinates_df.iloc[index][LON_FEATURE], coordinates_df.iloc[index][LAT_FEATURE]
+        for amenity in amenity_data:
+            for item in get_nearby_amenities(lat1, lon1, amenity_data[amenity], amenity_index.get(amenity)):
+                lon2, lat2 = item['lon'], item['lat']
+                calculated_distance = get_distance(lon1, lat1, lon2, lat2)
+                for distance in DISTANCES:
+                    if calculated_distance < distance:
+                        key = amenity + "_" + str(distance)
+                        coordinates_df.at[index, key] = coordinates_df.iloc[index][key] + 1
+
+
+def get_distances_batch(
+    lon1: npt.NDArray[np.float64],
+    lat1: npt.NDArray[np.float64],
+    lon2: npt.NDArray[np.float64],
+    lat2: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Calculate distances between pairs of points with the formula of get_distance.
+    
+    Parameters
+    ----------
+     lon1: npt.NDArray[np.float64]
+     lat1: npt.NDArray[np.float64]
+     lon2: npt.NDArray[np.float64]
+     lat2: npt.NDArray[np.float64]
+    
+    Returns
+    -------
+     distances: npt.NDArray[np.float64]
+    
+    """
+    rad_lat1 = lat1 * pi / 180.0
+    rad_lat2 = lat2 * pi / 180.0
+    delta_long = lon2 * pi / 180.0 - lon1 * pi / 180.0
+    delta_lat = rad_lat2 - rad_lat1
+    ad = 2 * np.arcsin(
+        np.sqrt(np.sin(delta_lat / 2) ** 2 + np.cos(rad_lat1) * np.cos(rad_lat2) * np.sin(delta_long / 2) ** 2)
+    )
+    distances: npt.NDArray[np.float64] = ad * EARTH_RADIUS
+    return distances
+
+
+def count_amenities(
+    lat: npt.NDArray[np.float64],
+    lon: npt.NDArray[np.float64],
+    coordinates: npt.NDArray[np.float64],
+    index: BallTree,
+) -> dict[int, npt.NDArray[np.int64]]:
+    """Count amenities of one type within DISTANCES from points.
+    
+    Candidates are found by the spatial index for all points at once, distances to them are calculated
+    as arrays. Math functions of numpy may differ from the ones of get_distance in the last bit, so distances
+    closer than BORDER_TOLERANCE to a radius are recalculated with get_distance and counts are identical
+    to the ones of add_amenity_counts_loop.
+    
+    Parameters
+    ----------
+     lat: latitudes of points
+     lon: longitudes of points
+     coordinates: latitudes and longitudes of amenities with shape (count, 2)
+     index: BallTree
+    
+    Returns
+    -------
+     counts of amenities by distance: dict[int, npt.NDArray[np.int64]]
+    
+    """
+    radius = (max(DISTANCES) + INDEX_MARGIN) / EARTH_RADIUS
+    candidates = index.query_radius(np.radians(np.column_stack((lat, lon))), r=radius)
+    rows = np.repeat(np.arange(len(lat)), [len(item) for item in candidates])
+    items = np.concatenate(candidates).astype(np.intp) if len(candidates) else np.empty(0, dtype=np.intp)
+    distances = get_distances_batch(lon[rows], lat[rows], coordinates[items, 1], coordinates[items, 0])
+    near_border = np.zeros(len(distances), dtype=bool)
+    for distance in DISTANCES:
+        near_border |= np.abs(distances - distance) < BORDER_TOLERANCE
+    for position in np.flatnonzero(near_border):
+        row, item = rows[position], items[position]
+        distances[position] = get_distance(lon[row], lat[row], coordinates[item, 1], coordinates[item, 0])
+    return {
+        distance: np.bincount(rows[distances < distance], minlength=len(lat)).astype(np.int64)
+        for distance in DISTANCES
+    }
+
+
+def get_amenity_coordinates(amenity_data: dict[str, list[dict[str, float]]]) -> dict[str, npt.NDArray[np.float64]]:
+    """Convert coordinates of amenities to arrays.
+    
+    Parameters
+    ----------
+     amenity_data: dict[str, list[dict[str, float]]]
+    
+    Returns
+    -------
+     dict with amenity as key and latitudes and longitudes with shape (count, 2) as value:
+     dict[str, npt.NDArray[np.float64]]
+    
+    """
+    return {
+        amenity: np.array([[item["lat"], item["lon"]] for item in items], dtype=np.float64).reshape(-1, 2)
+        for amenity, items in amenity_data.items()
+        if items
+    }
+
+
+def count_chunk(
+    lat: npt.NDArray[np.float64],
+    lon: npt.NDArray[np.float64],
+    amenities: dict[str, tuple[npt.NDArray[np.float64], BallTree]],
+) -> dict[str, dict[int, npt.NDArray[np.int64]]]:
+    """Count amenities of every type within DISTANCES from points of chunk.
+    
+    Parameters
+    ----------
+     lat: latitudes of points
+     lon: longitudes of points
+     amenities: dict with amenity as key and its coordinates and index as value
+    
+    Returns
+    -------
+     counts by amenity and distance: dict[str, dict[int, npt.NDArray[np.int64]]]
+    
+    """
+    return {
+        amenity: count_amenities(lat, lon, coordinates, index) for amenity, (coordinates, index) in amenities.items()
+    }
+
+
+# amenities of process of pool, coordinates are memory-mapped from files written by the main process
+worker_amenities: dict[str, tuple[npt.NDArray[np.float64], BallTree]] = dict()
+
+
+def init_worker(amenity_files: dict[str, str]) -> None:
+    """Map coordinates of amenities and build their indexes in process of pool.
+    
+    Parameters
+    ----------
+     amenity_files: dict with amenity as key and .npy file of its coordinates as value
+    
+    Returns
+    -------
+     nothing
+    
+    """
+    for amenity, path in amenity_files.items():
+        coordinates = np.load(path, mmap_mode="r")
+        worker_amenities[amenity] = (coordinates, BallTree(np.radians(coordinates), metric="haversine"))
+
+
+def count_chunk_in_worker(
+    lat: npt.NDArray[np.float64], lon: npt.NDArray[np.float64]
+) -> dict[str, dict[int, npt.NDArray[np.int64]]]:
+    """Count amenities for chunk with amenities of process.
+    
+    Parameters
+    ----------
+     lat: latitudes of points
+     lon: longitudes of points
+    
+    Returns
+    -------
+     counts by amenity and distance: dict[str, dict[int, npt.NDArray[np.int64]]]
+    
+    """
+    return count_chunk(lat, lon, worker_amenities)
+
+
+def iterate_chunk_counts(
+    lat: npt.NDArray[np.float64],
+    lon: npt.NDArray[np.float64],
+    amenity_coordinates: dict[str, npt.NDArray[np.float64]],
+    amenity_index: dict[str, BallTree],
+    chunk_size: int,
+    workers: int,
+) -> Iterator[tuple[slice, dict[str, dict[int, npt.NDArray[np.int64]]]]]:
+    """Count amenities chunk by chunk in the order of points.
+    
+    With several workers chunks are counted by a process pool. Amenity coordinates are written to .npy files
+    once and memory-mapped by the processes, only points of chunks and their counts are sent between processes.
+    At most two chunks per worker are queued, so memory doesn't depend on count of points.
+    
+    Parameters
+    ----------
+     lat: latitudes of points
+     lon: longitudes of points
+     amenity_coordinates: dict with amenity as key and its coordinates as value
+     amenity_index: dict with amenity as key and its index as value
+     chunk_size: count of points in chunk
+     workers: count of processes
+    
+    Returns
+    -------
+     chunk and its counts by amenity and distance: Iterator[tuple[slice, dict[str, dict[int, npt.NDArray[np.int64]]]]]
+    
+    """
+    chunks = [slice(start, start + chunk_size) for start in range(0, len(lat), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        amenities = {amenity: (amenity_coordinates[amenity], amenity_index[amenity]) for amenity in amenity_index}
+        for chunk in chunks:
+            yield chunk, count_chunk(lat[chunk], lon[chunk], amenities)
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        amenity_files = dict()
+        for number, (amenity, coordinates) in enumerate(amenity_coordinates.items()):
+            amenity_files[amenity] = os.path.join(tmp_dir, f"{number}.npy")
+            np.save(amenity_files[amenity], coordinates)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(amenity_files,)) as pool:
+            pending: deque[tuple[slice, Future[dict[str, dict[int, npt.NDArray[np.int64]]]]]] = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(count_chunk_in_worker, lat[chunk], lon[chunk])))
+                if len(pending) >= 2 * workers:
+                    done_chunk, future = pending.popleft()
+                    yield done_chunk, future.result()
+            while pending:
+                done_chunk, future = pending.popleft()
+                yield done_chunk, future.result()
+
+
+def add_amenity_counts(
+    coordinates_df: pd.DataFrame,
+    amenity_data: dict[str, list[dict[str, float]]],
+    amenity_index: dict[str, BallTree],
+    chunk_size: int = 10000,
+    workers: int = 1,
+) -> None:
+    """Add counts of amenities within DISTANCES to coordinates.
+    
+    Points are processed in chunks, so memory of candidate pairs is bounded by the chunk size. Counts of chunks
+    are written to their rows, so the result doesn't depend on count of workers.
+    
+    Parameters
+    ----------
+     coordinates_df: pd.DataFrame
+     amenity_data: dict[str, list[dict[str, float]]]
+     amenity_index: dict[str, BallTree]
+     chunk_size: count of points in chunk
+     workers: count of processes
+    
+    Returns
+    -------
+     nothing
+    
+    """
+    lat = coordinates_df[LAT_FEATURE].to_numpy(dtype=np.float64)
+    lon = coordinates_df[LON_FEATURE].to_numpy(dtype=np.float64)
+    counts = {
+        amenity: {distance: np.zeros(len(lat), dtype=np.int64) for distance in DISTANCES} for amenity in amenity_data
+    }
+    amenity_coordinates = get_amenity_coordinates(amenity_data)
+    for chunk, chunk_counts in iterate_chunk_counts(lat, lon, amenity_coordinates, amenity_index, chunk_size, workers):
+        for amenity, amenity_counts in chunk_counts.items():
+            for distance, values in amenity_counts.items():
+                counts[amenity][distance][chunk] = values
+    for amenity in amenity_data:
+        for distance in DISTANCES:
+            coordinates_df[amenity + "_" + str(distance)] = counts[amenity][distance]
+
+
+def add_new_amenity_counts(
+    coordinates_df: pd.DataFrame,
+    amenity_data: dict[str, list[dict[str, float]]],
+    amenity_index: dict[str, BallTree],
+    previous_counts: Optional[pd.DataFrame],
+    chunk_size: int = 10000,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """Add counts of amenities, counting only addresses whose coordinates are not counted by previous run.
+    
+    Parameters
+    ----------
+     coordinates_df: pd.DataFrame
+     amenity_data: dict[str, list[dict[str, float]]]
+     amenity_index: dict[str, BallTree]
+     previous_counts: addresses, coordinates and counts of previous run or None if there is no previous run
+     chunk_size: count of points in chunk
+     workers: count of processes
+    
+    Returns
+    -------
+     coordinates with counts: pd.DataFrame
+    
+    """
+    keys = [ADDRESS_FEATURE, LAT_FEATURE, LON_FEATURE]
+    columns = [amenity + "_" + str(distance) for amenity in amenity_data for distance in DISTANCES]
+    df = coordinates_df.copy()
+    new = np.ones(len(df), dtype=bool)
+    if previous_counts is not None:
+        df = df.merge(previous_counts[keys + columns], on=keys, how="left", indicator=True)
+        new = (df.pop("_merge") == "left_only").to_numpy()
+    click.echo(f"{len(df) - new.sum()} addresses are counted by previous run, {new.sum()} new addresses")
+    new_df = coordinates_df[new].reset_index(drop=True)
+    add_amenity_counts(new_df, amenity_data, amenity_index, chunk_size, workers)
+    for column in columns:
+        values = np.zeros(len(df), dtype=np.int64)
+        if previous_counts is not None:
+            values[~new] = df.loc[~new, column].to_numpy()
+        values[new] = new_df[column].to_numpy()
+        df[column] = values
+    return df
+
+
 @click.command()
 @click.argument("input_feature_file", type=click.Path(readable=True))
 @click.argument("coordinates_file", type=click.Path(readable=True))
 @click.argument("output_feature_file", type=click.Path(writable=True))
 @click.option("--amenity-files", "-af", type=click.STRING, help="Files with amenity info", multiple=True, default=[])
-def cli(input_feature_file: str, coordinates_file: str, output_feature_file: str, amenity_files: list[str]) -> None:
+@click.option(
+    "--engine", type=click.Choice(["vectorized", "loop"]), default="vectorized", help="Implementation of counting"
+)
+@click.option("--workers", type=click.INT, default=1, help="Processes of vectorized engine")
+@click.option("--chunk-size", type=click.INT, default=10000, help="Points in chunk of vectorized engine")
+@click.option("--incremental", is_flag=True, help="Count amenities only for addresses which are new since previous run")
+def cli(
+    input_feature_file: str,
+    coordinates_file: str,
+    output_feature_file: str,
+    amenity_files: list[str],
+    engine: str,
+    workers: int,
+    chunk_size: int,
+    incremental: bool,
+) -> None:
     """Build dataset.
     
     Parameters
@@ -77,6 +473,10 @@ def cli(input_feature_file: str, coordinates_file: str, output_feature_file: str
      coordinates_file: str
      output_feature_file: str
      amenity_files: list[str]
+     engine: str
+     workers: int
+     chunk_size: int
+     incremental: reuse counts of previous run, new addresses are counted with vectorized engine
     
     Returns
     -------
@@ -86,30 +486,32 @@ def cli(input_feature_file: str, coordinates_file: str, output_feature_file: str
     df = pd.read_csv(input_feature_file)
     coordinates_df = pd.read_csv(coordinates_file)
     amenity_data = load_amenity_data(amenity_files)
+    amenity_index = build_amenity_index(amenity_data)
     coordinates_df.dropna(subset=[LAT_FEATURE, LON_FEATURE], inplace=True)
     coordinates_df.reset_index(drop=True, inplace=True)
-    for amenity in amenity_data:
-        for distance in DISTANCES:
-            key = amenity + "_" + str(distance)
-            coordinates_df[key] = 0
-    for index in range(len(coordinates_df)):
-        if index % 100 == 0:
-            click.echo(f"{round(index / len(coordinates_df) * 100, 2)}%")
-        for amenity in amenity_data:
-            for item in amenity_data[amenity]:
-                lon1, lat1 = coordinates_df.iloc[index][LON_FEATURE], coordinates_df.iloc[index][LAT_FEATURE]
-                lon2, lat2 = item['lon'], item['lat']
-                calculated_distance = get_distance(lon1, lat1, lon2, lat2)
-                for distance in DISTANCES:
-                    if calculated_distance < distance:
-                        key = amenity + "_" + str(distance)
-                        coordinates_df.at[index, key] = coordinates_df.iloc[index][key] + 1
+    if incremental:
+        # counts depend on amenities and their order, so they are reused only with the same amenity files
+        fingerprint = get_fingerprint([__file__, *amenity_files])
+        state = load_state(output_feature_file, fingerprint)
+        previous_counts = None
+        if state:
+            previous_counts = pd.DataFrame(state["counts"]).astype({LAT_FEATURE: np.float64, LON_FEATURE: np.float64})
+        coordinates_df = add_new_amenity_counts(
+            coordinates_df, amenity_data, amenity_index, previous_counts, chunk_size, workers
+        )
+    elif engine == "loop":
+        add_amenity_counts_loop(coordinates_df, amenity_data, amenity_index)
+    else:
+        add_amenity_counts(coordinates_df, amenity_data, amenity_index, chunk_size, workers)
     # merge data
     merged_df = pd.merge(df, coordinates_df, on=[ADDRESS_FEATURE])
     merged_df.drop(columns=[ADDRESS_FEATURE], inplace=True)
     # save
-    merged_df.to_csv(output_feature_file, index=False)
+    if incremental:
+        save_output(merged_df, output_feature_file, fingerprint, {"counts": coordinates_df.to_dict(orient="list")})
+    else:
+        merged_df.to_csv(output_feature_file, index=False)
     
     
 if __name__ == "__main__":
-    cli() 
\ No newline at end of file
+    cli()
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""Persistent store of geocoding results shared by the pipeline and the serving service."""
+
+import sqlite3
+import time
+from typing import Optional
+
+# table of the geocoding cache of the service (backend/src/utils/geocoding_cache.py),
+# so the service reads addresses geocoded by the pipeline and the pipeline reads ones geocoded by the service
+CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS geocoding "
+    "(address TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+)
+# count of keys in one select, less than the default limit of SQLite variables
+SELECT_CHUNK_SIZE = 500
+
+
+def normalize_address(address: str) -> str:
+    """Normalize address to use it as key, the same as normalize_address of the service.
+
+    Parameters
+    ----------
+     address: str
+
+    Returns
+    -------
+     normalized address: str
+
+    """
+    return " ".join(address.casefold().split())
+
+
+class GeocodingStore:
+
+    """SQLite store of coordinates by normalized address.
+
+    Every result is committed at once, so results of an interrupted run are kept. Addresses which are not
+    found are stored with a shorter TTL to request them again later.
+    """
+
+    def __init__(self, path: str, ttl: float, negative_ttl: float) -> None:
+        """Open store.
+
+        Parameters
+        ----------
+         path: path of SQLite database
+         ttl: seconds to keep found coordinates
+         negative_ttl: seconds to keep addresses which are not found
+
+        Returns
+        -------
+         nothing
+
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(CREATE_TABLE)
+
+    def get_many(self, addresses: list[str]) -> dict[str, Optional[tuple[float, float]]]:
+        """Get not expired results of addresses.
+
+        Parameters
+        ----------
+         addresses: list[str]
+
+        Returns
+        -------
+         latitude and longitude or None if address is not found by address, without unknown addresses:
+         dict[str, Optional[tuple[float, float]]]
+
+        """
+        keys = list({normalize_address(address) for address in addresses})
+        rows = dict()
+        now = time.time()
+        for start in range(0, len(keys), SELECT_CHUNK_SIZE):
+            chunk = keys[start:start + SELECT_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            for key, lat, lon in self.connection.execute(
+                f"SELECT address, lat, lon FROM geocoding WHERE address IN ({placeholders}) AND expires_at > ?",
+                (*chunk, now),
+            ):
+                rows[key] = None if lat is None else (lat, lon)
+        results = dict()
+        for address in addresses:
+            key = normalize_address(address)
+            if key in rows:
+                results[address] = rows[key]
+        return results
+
+    def put(self, address: str, coordinates: Optional[tuple[float, float]]) -> None:
+        """Store result of address.
+
+        Parameters
+        ----------
+         address: str
+         coordinates: latitude and longitude or None if address is not found
+
+        Returns
+        -------
+         nothing
+
+        """
+        expires_at = time.time() + (self.negative_ttl if coordinates is None else self.ttl)
+        lat, lon = coordinates if coordinates is not None else (None, None)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO geocoding (address, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+            (normalize_address(address), lat, lon, expires_at),
+        )
+
+    def close(self) -> None:
+        """Close store."""
+        self.connection.close()
@@ -0,0 +1,101 @@
+"""Helpers for incremental runs of pipeline stages, which process only new rows of their inputs."""
+
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+import click
+import pandas as pd
+
+# state of incremental run is kept next to the output
+STATE_SUFFIX = ".state.json"
+READ_BLOCK_SIZE = 1 << 20
+
+
+def get_fingerprint(paths: list[str]) -> str:
+    """Hash contents of files which results depend on, like code of stage and its reference data.
+
+    Parameters
+    ----------
+     paths: list[str]
+
+    Returns
+    -------
+     fingerprint: str
+
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            while block := f.read(READ_BLOCK_SIZE):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_row_keys(path: str) -> pd.Series:
+    """Hash raw text of rows of CSV file, so keys don't depend on inferred types of columns.
+
+    Parameters
+    ----------
+     path: path of CSV file
+
+    Returns
+    -------
+     keys in the order of rows: pd.Series
+
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    return pd.Series([format(value, "016x") for value in hashes], dtype=object)
+
+
+def load_state(output_file: str, fingerprint: str) -> Optional[dict[str, Any]]:
+    """Load state of previous run if it can be reused.
+
+    Parameters
+    ----------
+     output_file: output filepath of stage
+     fingerprint: fingerprint of current run
+
+    Returns
+    -------
+     state or None if the stage has to process all rows: Optional[dict[str, Any]]
+
+    """
+    state_file = output_file + STATE_SUFFIX
+    if not os.path.exists(output_file) or not os.path.exists(state_file):
+        click.echo("No state of previous run, all rows are processed")
+        return None
+    with open(state_file, encoding="utf-8") as f:
+        state: dict[str, Any] = json.load(f)
+    if state.get("fingerprint") != fingerprint:
+        click.echo("Code or reference data are changed since previous run, all rows are processed")
+        return None
+    return state
+
+
+def save_output(df: pd.DataFrame, output_file: str, fingerprint: str, state: dict[str, Any]) -> None:
+    """Write output and state of run.
+
+    State is removed before writing output, so output interrupted while writing is rebuilt by the next run.
+
+    Parameters
+    ----------
+     df: output data
+     output_file: output filepath of stage
+     fingerprint: fingerprint of current run
+     state: values to reuse by the next run
+
+    Returns
+    -------
+     nothing
+
+    """
+    state_file = output_file + STATE_SUFFIX
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    df.to_csv(output_file, index=False)
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, **state}, f, ensure_ascii=False)